@@ -0,0 +1,260 @@
+import asyncio
+import contextlib
+import os
+
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, PlainTextResponse
+from starlette.routing import Route
+
+from models import FEATURE_RANGES, MODEL_FAMILIES, texture_options
+from registry import ModelRegistry
+from drift import DriftMonitor
+from metrics import predictions_total, register, span
+from metrics import render as render_metrics
+
+DEFAULT_MAX_BATCH_SIZE = 64
+DEFAULT_MAX_WAIT_MS = 2.0
+
+# JSON field -> feature column; texture is handled separately
+SAMPLE_FIELDS = {
+    "moisture": 'Moisture (%)',
+    "organic_matter": 'Organic Matter (%)',
+    "ph": 'pH',
+    "conductivity": 'Electrical Conductivity (dS/m)',
+}
+
+
+class MicroBatcher:
+    """Coalesces concurrent single-row requests into one batched model call.
+
+    The first queued request opens a batch that is closed once it holds
+    max_batch_size rows or max_wait_ms has passed. The batch is scored on a
+    worker thread while new requests queue up for the next one.
+    """
+
+    def __init__(self, predict_batch, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait_ms=DEFAULT_MAX_WAIT_MS):
+        self.predict_batch = predict_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = None
+        self._task = None
+        self.batches = 0
+        self.rows = 0
+        self.largest_batch = 0
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def submit(self, row):
+        """Queue one row and wait for its result"""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((row, future))
+        return await future
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            rows = [row for row, _ in batch]
+            try:
+                results = await loop.run_in_executor(None, self.predict_batch, rows)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.rows += len(rows)
+            self.largest_batch = max(self.largest_batch, len(rows))
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "rows": self.rows,
+            "mean_batch_size": self.rows / self.batches if self.batches else 0.0,
+            "largest_batch": self.largest_batch,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+        }
+
+
+def parse_sample(sample):
+    """Validate one JSON sample, returning its feature row"""
+    if not isinstance(sample, dict):
+        raise ValueError("Each sample must be a JSON object")
+
+    texture = sample.get("texture")
+    if isinstance(texture, str):
+        if texture not in texture_options:
+            raise ValueError(f"texture must be one of: {', '.join(texture_options)}")
+        texture = texture_options[texture]
+    elif texture not in texture_options.values() or isinstance(texture, bool):
+        raise ValueError(f"texture must be one of: {', '.join(texture_options)}, or its code")
+
+    row = [float(texture)]
+    for field, column in SAMPLE_FIELDS.items():
+        value = sample.get(field)
+        if not isinstance(value, (int, float)) or isinstance(value, bool):
+            raise ValueError(f"{field} must be a number")
+        low, high = FEATURE_RANGES[column]
+        if not low <= value <= high:
+            raise ValueError(f"{field} must be between {low} and {high}")
+        row.append(float(value))
+    return row
+
+
+def make_batch_predictor(registry, family):
+    """Wrap a family's registry release as a function from a list of rows to per-row JSON results"""
+    def predict_batch(rows):
+        # The whole batch is scored by one release, even if a newer one is swapped in meanwhile
+        release = registry.get(family)
+        with span("api_predict_batch"):
+            result = release.predictor.predict(rows)
+        predictions_total.inc(len(rows), model=family, source="api")
+        return [
+            {
+                "model_version": release.version,
+                "soil_quality": result["soil_quality"][i],
+                "industrial_use": result["industrial_use"][i],
+                "soil_quality_proba": dict(zip(result["soil_quality_classes"], result["soil_quality_proba"][i].tolist())),
+                "industrial_use_proba": dict(zip(result["industrial_use_classes"], result["industrial_use_proba"][i].tolist())),
+            }
+            for i in range(len(rows))
+        ]
+    return predict_batch
+
+
+def create_app(model_dir=None, max_batch_size=None, max_wait_ms=None):
+    """Build the prediction API; settings default to SOIL_* environment variables"""
+    model_dir = model_dir or os.environ.get("SOIL_MODEL_DIR", ".")
+    max_batch_size = max_batch_size or int(os.environ.get("SOIL_API_MAX_BATCH_SIZE", DEFAULT_MAX_BATCH_SIZE))
+    max_wait_ms = max_wait_ms if max_wait_ms is not None else float(os.environ.get("SOIL_API_MAX_WAIT_MS", DEFAULT_MAX_WAIT_MS))
+    registry = ModelRegistry(model_dir)
+    drift_monitor = register(DriftMonitor(model_dir))
+    batchers = {}
+    batchers_lock = asyncio.Lock()
+
+    async def get_batcher(family):
+        """The family's batcher, started once its models are available; None until then"""
+        if family not in batchers:
+            async with batchers_lock:
+                if family not in batchers:
+                    # Loading reads and checksums the model files, so it runs off the event loop
+                    release = await asyncio.get_running_loop().run_in_executor(None, registry.get, family)
+                    if release is None:
+                        return None
+                    batcher = MicroBatcher(make_batch_predictor(registry, family), max_batch_size, max_wait_ms)
+                    await batcher.start()
+                    batchers[family] = batcher
+        return batchers[family]
+
+    async def load_batcher(family):
+        """get_batcher, recording a family whose files fail to load in registry.errors instead of raising"""
+        try:
+            return await get_batcher(family)
+        except (ValueError, RuntimeError) as e:
+            registry.errors[family] = str(e)
+            raise
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        # Families whose models exist now are loaded before the first request; the others on theirs.
+        # A family that fails to load is retried, and answered with a 503, by each request for it
+        for family in MODEL_FAMILIES:
+            with contextlib.suppress(ValueError, RuntimeError):
+                await load_batcher(family)
+        # Retrained models are picked up in the background while requests keep being served
+        registry.start()
+        yield
+        registry.stop()
+        for batcher in batchers.values():
+            await batcher.stop()
+
+    async def predict(request):
+        try:
+            payload = await request.json()
+        except ValueError:
+            return JSONResponse({"error": "Request body must be JSON"}, status_code=400)
+        if not isinstance(payload, dict):
+            return JSONResponse({"error": "Request body must be a JSON object"}, status_code=400)
+
+        family = payload.get("model", "RandomForest")
+        if family not in MODEL_FAMILIES:
+            return JSONResponse({"error": f"model must be one of: {', '.join(MODEL_FAMILIES)}"}, status_code=400)
+        try:
+            batcher = await load_batcher(family)
+        except (ValueError, RuntimeError) as e:
+            return JSONResponse({"error": str(e)}, status_code=503)
+        if batcher is None:
+            return JSONResponse({"error": f"Model not loaded for {family}"}, status_code=503)
+
+        samples = payload["samples"] if "samples" in payload else [payload]
+        if not isinstance(samples, list) or not samples:
+            return JSONResponse({"error": "samples must be a non-empty list"}, status_code=400)
+        try:
+            rows = [parse_sample(sample) for sample in samples]
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=422)
+        drift_monitor.observe_rows(rows)
+
+        results = await asyncio.gather(*(batcher.submit(row) for row in rows))
+        if "samples" in payload:
+            return JSONResponse({"model": family, "predictions": results})
+        return JSONResponse({"model": family, **results[0]})
+
+    async def health(request):
+        models = {family: {**batcher.stats(), "version": registry.status()[family]["version"],
+                           "reload_error": registry.errors.get(family)}
+                  for family, batcher in batchers.items()}
+        # Families that never loaded, e.g. because their files fail the manifest checksums
+        models.update({family: {"version": None, "load_error": error}
+                       for family, error in registry.errors.items() if family not in batchers})
+        return JSONResponse({
+            "status": "ok" if batchers else "no models loaded",
+            "models": models,
+        })
+
+    async def drift(request):
+        return JSONResponse(drift_monitor.status())
+
+    async def metrics(request):
+        return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+    return Starlette(
+        routes=[
+            Route("/predict", predict, methods=["POST"]),
+            Route("/health", health, methods=["GET"]),
+            Route("/drift", drift, methods=["GET"]),
+            Route("/metrics", metrics, methods=["GET"]),
+        ],
+        lifespan=lifespan,
+    )
+
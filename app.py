@@ -1,12 +1,26 @@
 import streamlit as st
-import pickle
-import pandas as pd
-import base64
+import atexit
 import datetime
 import os
+import sys
+import tempfile
+import time
 from auth import check_authentication, logout
-from auth import load_users, save_users, hash_password
-
+from auth import change_password
+from models import FEATURE_COLUMNS, MODEL_FAMILIES
+from models import texture_options
+from cache import prediction_cache
+from history import get_history_store
+import static_pages
+from registry import ModelRegistry
+import metrics
+from metrics import span
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+
+rerun_start = time.perf_counter()
+rerun_cpu_start = time.thread_time()
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
 
 # Set page configuration
 st.set_page_config(
@@ -15,55 +29,303 @@ st.set_page_config(
     layout="wide"
 )
 
-# Apply custom CSS
+# Export metrics if SOIL_METRICS_PORT / SOIL_METRICS_FILE are set
+metrics.start_exporters()
+script_run_ctx = get_script_run_ctx()
+if script_run_ctx is not None:
+    metrics.mark_session(script_run_ctx.session_id)
+
+# Apply custom CSS. The file is read once per process; the style block still has to
+# be sent on every rerun, or the page loses it.
+@st.cache_resource
 def load_css():
-    with open("style.css", "r") as f:
-        css = f.read()
-    st.markdown(f'<style>{css}</style>', unsafe_allow_html=True)
+    try:
+        with open("style.css", "r") as f:
+            return f'<style>{f.read()}</style>'
+    except FileNotFoundError:
+        return None
 
-try:
-    load_css()
-except FileNotFoundError:
-    pass
+with span("css"):
+    css = load_css()
+    if css is not None:
+        st.markdown(css, unsafe_allow_html=True)
 
 
 
+# One model registry per server process. It loads each family the first time
+# its page is visited, from memory-mapped forest artifacts where they exist, and
+# swaps in retrained models in the background without a cold pause. numpy,
+# pandas and scikit-learn are first imported there, not when the login page renders.
+@st.cache_resource
+def get_registry():
+    # Some runners only put the app directory on sys.path while a rerun executes,
+    # so keep a second entry for the registry threads' imports; a duplicate is harmless
+    sys.path.append(APP_DIR)
+    return ModelRegistry().start()
+
+# Optional out-of-process inference: with SOIL_INFERENCE_WORKERS=N, predictions are
+# scored by N local worker processes instead of competing for this process's GIL
+@st.cache_resource
+def get_worker_pool():
+    count = int(os.environ.get("SOIL_INFERENCE_WORKERS", "0"))
+    if count <= 0:
+        return None
+    from workers import WorkerPool
+    pool = WorkerPool(count).start()
+    atexit.register(pool.stop)
+    return pool
+
+# Input drift against the training data, summarised in constant memory and exported
+# with the other metrics. Requests are folded into running statistics and not kept.
+@st.cache_resource
+def get_drift_monitor():
+    from drift import DriftMonitor
+    return metrics.register(DriftMonitor())
+
+# Load every family (and start the worker pool) in the background while the user
+# is still on the login page. SOIL_WARMUP=0 turns this off.
+def warm_up_models():
+    if os.environ.get("SOIL_WARMUP", "1") != "0":
+        get_registry().warm_up()
+        get_worker_pool()
+
 # Check authentication first
 st.session_state.current_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-authenticated = check_authentication()
+with span("auth"):
+    authenticated = check_authentication(on_login_page=warm_up_models)
+
+# What-if grids are cached on the model version, the swept features and the inputs held fixed
+@st.cache_data(max_entries=64, show_spinner=False)
+def run_sweep(family, version, fixed, x_column, y_column, points, _release):
+    import sweep
+    with span("sweep"):
+        result = sweep.sweep(_release.predictor, fixed, x_column, y_column, points)
+    metrics.predictions_total.inc(result["rows"], model=family, source="sweep")
+    return result
+
+# What-if panel: vary one or two features across their ranges, holding the others at the page's inputs
+def render_what_if(family, inputs):
+    if not st.toggle("🔬 What-if sensitivity sweep"):
+        return
+    import altair as alt
+    import numpy as np
+    import pandas as pd
+    import sweep
+
+    col1, col2, col3 = st.columns(3)
+    x_column = col1.selectbox("Vary:", sweep.SWEEP_COLUMNS)
+    y_choice = col2.selectbox("Against:", ["(nothing)"] + [column for column in sweep.SWEEP_COLUMNS if column != x_column])
+    y_column = None if y_choice == "(nothing)" else y_choice
+    points = col3.slider("Grid points per axis", 20, 200, sweep.DEFAULT_POINTS, step=10)
+    target = st.radio("Target:", ["Soil Quality", "Industrial Use"], horizontal=True)
+
+    fixed = {column: value for column, value in inputs.items() if column not in (x_column, y_column)}
+    release = get_registry().get(family)
+    if release is None:
+        st.error("Model not loaded")
+        return
+    result = run_sweep(family, release.version, fixed, x_column, y_column, points, release)
+    proba, classes = result[target]
+    labels = classes[proba.argmax(axis=-1)]
+
+    if y_column is None:
+        curves = pd.DataFrame(proba, columns=classes)
+        curves["x"] = result["x"]
+        curves = curves.melt(id_vars="x", var_name="Class", value_name="Probability")
+        lines = alt.Chart(curves).mark_line().encode(
+            x=alt.X("x:Q", title=x_column), y=alt.Y("Probability:Q", scale=alt.Scale(domain=[0, 1])), color="Class:N")
+        current = alt.Chart(pd.DataFrame({"x": [inputs[x_column]]})).mark_rule(strokeDash=[4, 4]).encode(x="x:Q")
+        st.altair_chart(lines + current, width="stretch")
+
+        boundaries = sweep.class_boundaries(result["x"], labels)
+        if boundaries:
+            st.write("\n".join(f"- **{before} → {after}** at {x_column} ≈ {value:.2f}" for value, before, after in boundaries))
+        else:
+            st.write(f"Predicted **{labels[0]}** across the whole {x_column} range.")
+    else:
+        # One rectangle per grid cell, reaching halfway to its neighbours
+        x_step = (result["x"][1] - result["x"][0]) / 2
+        y_step = (result["y"][1] - result["y"][0]) / 2
+        cells = pd.DataFrame({
+            "x": np.repeat(result["x"], len(result["y"])),
+            "y": np.tile(result["y"], len(result["x"])),
+            "Class": labels.ravel(),
+            "Probability": proba.max(axis=-1).ravel(),
+        })
+        cells["x0"], cells["x1"] = cells["x"] - x_step, cells["x"] + x_step
+        cells["y0"], cells["y1"] = cells["y"] - y_step, cells["y"] + y_step
+        grid = alt.Chart(cells).mark_rect().encode(
+            x=alt.X("x0:Q", title=x_column), x2="x1", y=alt.Y("y0:Q", title=y_column), y2="y1",
+            tooltip=[alt.Tooltip("x:Q", title=x_column), alt.Tooltip("y:Q", title=y_column), "Class:N", "Probability:Q"])
+        current = alt.Chart(pd.DataFrame({"x": [inputs[x_column]], "y": [inputs[y_column]]})).mark_point(
+            color="black", size=80).encode(x="x:Q", y="y:Q")
+
+        col1, col2 = st.columns(2)
+        col1.write("Predicted class")
+        col1.altair_chart(grid.encode(color="Class:N") + current, width="stretch")
+        col2.write("Probability of the predicted class")
+        col2.altair_chart(grid.encode(color=alt.Color("Probability:Q", scale=alt.Scale(domain=[0, 1]))) + current,
+                          width="stretch")
+    st.caption(f"{result['rows']:,} grid points scored in one batch")
+
+# Input fields shared by the predict and compare pages: returns the texture name and the feature tuple
+def render_soil_inputs():
+    texture = st.selectbox("Select Texture Type:", list(texture_options.keys()))
+    texture_input = texture_options[texture]
+    moisture_input = st.slider("Moisture (%)", 0.0, 100.0, 20.0)
+    organic_matter_input = st.slider("Organic Matter (%)", 0.0, 10.0, 2.5)
+    ph_input = st.number_input("pH", min_value=0.0, max_value=14.0, value=7.0, step=0.1)
+    conductivity_input = st.number_input("Electrical Conductivity (dS/m)", min_value=0.0, max_value=10.0, value=1.0, step=0.1)
+    return texture, (texture_input, moisture_input, organic_matter_input, ph_input, conductivity_input)
+
+# Accuracy quoted on each predict page when the models have no manifest metrics
+MODEL_ACCURACY_NOTES = {
+    "RandomForest": "The Random Forest model achieves a 99% accuracy level.",
+    "Logistic Regression": "The Logistic Regression model achieves a 72% accuracy level.",
+}
+
+# Input columns of a prediction history record
+def history_inputs(texture, features):
+    _, moisture, organic_matter, ph, conductivity = features
+    return {"texture": texture, "moisture": moisture, "organic_matter": organic_matter, "ph": ph,
+            "conductivity": conductivity}
+
+# Predict page for one model family. The registry release is fetched once, so a
+# prediction that is running when a retrained model is swapped in finishes on its version.
+def render_predict_page(family):
+    st.header("🔍 Soil Quality & Industrial Use Prediction")
+    release = get_registry().get(family)
+    accuracy = release.accuracy() if release is not None else {}
+    if accuracy:
+        scores = " and ".join(f"{accuracy[target]:.1%} for {target.lower()}" for target in sorted(accuracy, reverse=True))
+        st.write(f"##### 📍 Model version {release.version} scores {scores} on held-out data.")
+    else:
+        st.write(f"##### 📍 {MODEL_ACCURACY_NOTES[family]}")
+    st.write("Enter soil parameters below to predict its quality and industrial usability.")
+    texture, features = render_soil_inputs()
+
+    # Score on the worker pool when there is one, falling back to this process if it is busy, unhealthy
+    # or still on another model version
+    def predict_soil_quality_industrial_use(features):
+        pool = get_worker_pool()
+        if pool is not None:
+            from workers import WorkerPoolError
+            try:
+                # Results are cached under release.version, so only accept a worker on the same version
+                return pool.predict_one(family, features, release.version)
+            except (WorkerPoolError, TimeoutError):
+                metrics.errors_total.inc(stage="worker_pool")
+        return release.predictor.predict_one(*features)
 
-# Load models
-@st.cache_resource
-def load_models():
-    models = {}
-    if os.path.exists("rf_soil_quality_model.pkl"):
-        with open("rf_soil_quality_model.pkl", "rb") as f:
-            models["rf_soil_quality"] = pickle.load(f)
-
-    if os.path.exists("rf_industrial_use_model.pkl"):
-        with open("rf_industrial_use_model.pkl", "rb") as f:
-            models["rf_industrial_use"] = pickle.load(f)
-
-    if os.path.exists("rf_soil_quality_model_LG.pkl"):
-        with open("rf_soil_quality_model_LG.pkl", "rb") as f:
-            models["rf_soil_quality_LG"] = pickle.load(f)
-
-    if os.path.exists("rf_industrial_use_model_LG.pkl"):
-        with open("rf_industrial_use_model_LG.pkl", "rb") as f:
-            models["rf_industrial_use_LG"] = pickle.load(f)
-            
-    return models
+    # Predict button
+    if st.button("Predict"):
+        with span("predict"):
+            if release is not None:
+                soil_quality, industrial_use = prediction_cache.get_or_compute(
+                    family, release.version, features, predict_soil_quality_industrial_use)
+                metrics.predictions_total.inc(model=family, source="ui")
+            else:
+                soil_quality, industrial_use = "Model not loaded", "Model not loaded"
+                metrics.errors_total.inc(stage="predict")
+        get_drift_monitor().observe(features)
 
-models = load_models()
+        # Save prediction to user history
+        get_history_store().append(st.session_state.username, {
+            "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "model": family,
+            **history_inputs(texture, features),
+            "soil_quality": soil_quality,
+            "industrial_use": industrial_use
+        })
 
-# Define mappings
-soil_quality_mapping = {0: "Poor", 1: "Moderate", 2: "Good"}
-industrial_use_mapping = {0: "Agriculture", 1: "Construction", 2: "Landscaping"}
+        st.success(f"##### 🌱 **Predicted Soil Quality:** {soil_quality}")
+        st.info(f"##### 🏗 **Predicted Industrial Use:** {industrial_use}")
+
+        cache_stats = prediction_cache.stats()
+        st.caption(f"Prediction cache: {cache_stats['hits']:,} hits / {cache_stats['misses']:,} misses ({cache_stats['hit_rate']:.0%} hit rate)")
+
+    render_what_if(family, dict(zip(FEATURE_COLUMNS, features)))
+
+# Compare page: one input scored by every loaded model family at once on the compare thread pool
+def render_compare_page():
+    st.header("⚖️ Compare Models")
+    st.write("Enter soil parameters once to see how every model scores them, with each model's confidence and latency.")
+    texture, features = render_soil_inputs()
+
+    if not st.button("Compare"):
+        return
+    import compare
+    import pandas as pd
+
+    registry = get_registry()
+    releases = {family: registry.get(family) for family in MODEL_FAMILIES}
+    releases = {family: release for family, release in releases.items() if release is not None}
+    if not releases:
+        st.error("Model not loaded")
+        return
+    with span("compare"):
+        results, seconds = compare.compare(releases, features)
+    get_drift_monitor().observe(features)
+
+    summary = []
+    for family, result in results.items():
+        if "error" in result:
+            metrics.errors_total.inc(stage="compare")
+            st.error(f"{family}: {result['error']}")
+            continue
+        metrics.predictions_total.inc(model=family, source="compare")
+        get_history_store().append(st.session_state.username, {
+            "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "model": family,
+            **history_inputs(texture, features),
+            "soil_quality": result["soil_quality"],
+            "industrial_use": result["industrial_use"]
+        })
+        summary.append({
+            "Model": family,
+            "Version": result["version"],
+            "Soil Quality": result["soil_quality"],
+            "Soil Quality confidence": f"{result['soil_quality_proba'][result['soil_quality']]:.1%}",
+            "Industrial Use": result["industrial_use"],
+            "Industrial Use confidence": f"{result['industrial_use_proba'][result['industrial_use']]:.1%}",
+            "Latency (ms)": round(result["seconds"] * 1000, 2),
+        })
+    if not summary:
+        return
+    st.dataframe(pd.DataFrame(summary), hide_index=True)
+
+    # Class probabilities side by side: one bar per model for every class
+    col1, col2 = st.columns(2)
+    for col, target, key in ((col1, "Soil Quality", "soil_quality_proba"), (col2, "Industrial Use", "industrial_use_proba")):
+        probabilities = pd.DataFrame({row["Model"]: results[row["Model"]][key] for row in summary})
+        col.write(f"**{target} probabilities**")
+        col.bar_chart(probabilities, stack=False, y_label="Probability")
+
+    model_seconds = sum(results[row["Model"]]["seconds"] for row in summary)
+    st.caption(f"{len(summary)} models scored concurrently in {seconds * 1000:.1f} ms "
+               f"({model_seconds * 1000:.1f} ms if run one after another)")
+
+# Downloads are written by write(path) to a private temporary file (mode 0600, unique per
+# request), read back for st.download_button and deleted before the rerun ends. Writing is
+# streamed, but st.download_button serves from memory, so the whole file is held there once
+# per download; exports too large for that belong on the command line (batch.py)
+def export_bytes(write, suffix):
+    fd, path = tempfile.mkstemp(suffix=suffix)
+    os.close(fd)
+    try:
+        write(path)
+        with open(path, "rb") as f:
+            return f.read()
+    finally:
+        os.remove(path)
+
+# Prediction history rows shown per page on the Profile page
+HISTORY_PAGE_SIZE = 25
 
 # Sidebar Navigation
 st.sidebar.title("🏷️ Soil Quality Predictor")
 st.sidebar.write(f"Welcome, {st.session_state.username}!")
-page = st.sidebar.radio("Navigate", ["Home", "Predict [RandomForest]", "Predict [Logistic Regression]", "Resources","About Us", "Profile"])
+page = st.sidebar.radio("Navigate", ["Home"] + [f"Predict [{family}]" for family in MODEL_FAMILIES] + ["Compare Models", "Batch Predict", "Resources","About Us", "Profile"])
 
 # Add logout button
 if st.sidebar.button("Logout"):
@@ -72,200 +334,69 @@ if st.sidebar.button("Logout"):
 # Add a horizontal separator
 st.sidebar.markdown("---")
 
-# Create some spacing to push the text towards the end of the sidebar
-for _ in range(15):
-    st.sidebar.write(" ")
-
-# Add centered text at the bottom using HTML
-st.sidebar.markdown(
-    """
-    <div style='text-align: center;'>
-        
-    </div>
-    """,
-    unsafe_allow_html=True
-)
-
 if page == "Home":
     st.header("Welcome to Soil Quality & Industrial Use Prediction")
-
-    st.write("##### This web Application predicts soil quality and its potential industrial use based on key parameters such as texture, moisture, organic matter, pH, and electrical conductivity.")
-    
-    st.write("### 📌 **How It Works:**")
-    st.write("##### 1️⃣ **Navigate to the Predict page using the sidebar.**")
-    st.write("##### 2️⃣ **Enter the required soil parameters.**")
-    st.write("##### 3️⃣ **Click Predict to get the results.**")
-    st.write("### Let's get started! 🚀")
+    st.markdown(static_pages.HOME)
 
 elif page == "About Us":
     st.header("📖 About Us")
-    st.write("### Who We Are")
-    st.write("##### We are a team of developers who developed this app to help farmers, agronomists, and industrialists understand the soil quality and its potential uses in different sectors.")
-    st.write("##### Our mission is to provide reliable AI-driven predictions for optimal soil management and industrial use.")
-    st.write("### Our Goal:")
-    st.write("##### To empower industries and agriculture with insights on soil quality and its suitability for different industrial uses.")
-    st.write("### Real-World Impact")
-    st.write("##### This app has already helped several farmers optimize soil management practices, reduce costs, and enhance productivity. We're constantly working to improve the accuracy of our models and add new features that will help a wider range of industries.")
-    st.write("### Contact Us")
-    st.write("##### We value your feedback! Feel free to reach out to us for any inquiries or suggestions. Stay connected:")
-    st.write("##### [Email Us](mailto:contact@soilpredictions.com)")
-    st.write("Follow us on  [LinkedIn](https://www.linkedin.com/) | [Twitter](https://twitter.com/)")
-
-elif page == "Predict [RandomForest]":
-    st.header("🔍 Soil Quality & Industrial Use Prediction")
-    st.write("##### 📍 The Random Forest model achieves a 99% accuracy level.")
-    
-    st.write("Enter soil parameters below to predict its quality and industrial usability.")
-    
-    # Input fields
-    texture_options = {"Clayey": 0, "Sandy": 1, "Sandy Loam": 2, "Loamy": 3}
-    texture = st.selectbox("Select Texture Type:", list(texture_options.keys()))
-    texture_input = texture_options[texture]
-    moisture_input = st.slider("Moisture (%)", 0.0, 100.0, 20.0)
-    organic_matter_input = st.slider("Organic Matter (%)", 0.0, 10.0, 2.5)
-    ph_input = st.number_input("pH", min_value=0.0, max_value=14.0, value=7.0, step=0.1)
-    conductivity_input = st.number_input("Electrical Conductivity (dS/m)", min_value=0.0, max_value=10.0, value=1.0, step=0.1)
-
-    # Prediction function
-    def predict_soil_quality_industrial_use(texture, moisture, organic_matter, ph, conductivity):
-        input_data = pd.DataFrame([[texture, moisture, organic_matter, ph, conductivity]],
-                                 columns=['Texture', 'Moisture (%)', 'Organic Matter (%)', 'pH', 'Electrical Conductivity (dS/m)'])
-        
-        if "rf_soil_quality" in models and "rf_industrial_use" in models:
-            soil_quality_pred = models["rf_soil_quality"].predict(input_data)[0]
-            industrial_use_pred = models["rf_industrial_use"].predict(input_data)[0]
-            return soil_quality_mapping.get(soil_quality_pred, "Unknown"), industrial_use_mapping.get(industrial_use_pred, "Unknown")
-        else:
-            return "Model not loaded", "Model not loaded"
-
-    # Predict button
-    if st.button("Predict"):  
-        soil_quality, industrial_use = predict_soil_quality_industrial_use(texture_input, moisture_input, organic_matter_input, ph_input, conductivity_input)
-        
-        # Save prediction to user history
-        if "prediction_history" not in st.session_state:
-            st.session_state.prediction_history = []
-            
-        st.session_state.prediction_history.append({
-            "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "model": "RandomForest",
-            "texture": texture,
-            "moisture": moisture_input,
-            "organic_matter": organic_matter_input,
-            "ph": ph_input,
-            "conductivity": conductivity_input,
-            "soil_quality": soil_quality,
-            "industrial_use": industrial_use
-        })
-        
-        st.success(f"##### 🌱 **Predicted Soil Quality:** {soil_quality}")
-        st.info(f"##### 🏗 **Predicted Industrial Use:** {industrial_use}")
-
-elif page == "Predict [Logistic Regression]":
-    st.header("🔍 Soil Quality & Industrial Use Prediction")
-    st.write("##### 📍 The Logistic Regression model achieves a 72% accuracy level.")
-    st.write("Enter soil parameters below to predict its quality and industrial usability.")
-    
-    # Input fields
-    texture_options = {"Clayey": 0, "Sandy": 1, "Sandy Loam": 2, "Loamy": 3}
-    texture = st.selectbox("Select Texture Type:", list(texture_options.keys()))
-    texture_input = texture_options[texture]
-    moisture_input = st.slider("Moisture (%)", 0.0, 100.0, 20.0)
-    organic_matter_input = st.slider("Organic Matter (%)", 0.0, 10.0, 2.5)
-    ph_input = st.number_input("pH", min_value=0.0, max_value=14.0, value=7.0, step=0.1)
-    conductivity_input = st.number_input("Electrical Conductivity (dS/m)", min_value=0.0, max_value=10.0, value=1.0, step=0.1)
-
-    # Prediction function
-    def predict_soil_quality_industrial_use(texture, moisture, organic_matter, ph, conductivity):
-        input_data = pd.DataFrame([[texture, moisture, organic_matter, ph, conductivity]],
-                                 columns=['Texture', 'Moisture (%)', 'Organic Matter (%)', 'pH', 'Electrical Conductivity (dS/m)'])
-        
-        if "rf_soil_quality_LG" in models and "rf_industrial_use_LG" in models:
-            soil_quality_pred = models["rf_soil_quality_LG"].predict(input_data)[0]
-            industrial_use_pred = models["rf_industrial_use_LG"].predict(input_data)[0]
-            return soil_quality_mapping.get(soil_quality_pred, "Unknown"), industrial_use_mapping.get(industrial_use_pred, "Unknown")
+    st.markdown(static_pages.ABOUT_US)
+
+elif page.startswith("Predict ["):
+    render_predict_page(page[len("Predict ["):-1])
+
+elif page == "Compare Models":
+    render_compare_page()
+
+elif page == "Batch Predict":
+    import batch
+
+    st.header("📦 Batch Soil Quality & Industrial Use Prediction")
+    st.write("##### Upload a CSV or Parquet file with one soil sample per row to score it in bulk.")
+    st.write(f"Required columns: {', '.join(FEATURE_COLUMNS)}. Texture may be a name ({', '.join(texture_options)}) or its code.")
+
+    uploaded_file = st.file_uploader("Soil samples", type=["csv", "parquet"])
+    family = st.selectbox("Model:", list(MODEL_FAMILIES.keys()))
+    output_format = st.radio("Output format:", ["csv", "parquet"], horizontal=True)
+    chunk_size = st.number_input("Rows per chunk", min_value=1000, max_value=1_000_000, value=batch.DEFAULT_CHUNK_SIZE, step=1000)
+
+    if uploaded_file is not None and st.button("Run Batch Prediction"):
+        progress_text = st.empty()
+
+        def report_progress(stats):
+            progress_text.write(f"{stats['rows']:,} rows scored...")
+
+        stats = {}
+        # Fetched once, so the whole file is scored by one version even if a retrained model is swapped in
+        release = get_registry().get(family)
+
+        def score_to(path):
+            stats.update(batch.score_file(uploaded_file, path, release.predictor, int(chunk_size),
+                                          input_format=batch.detect_format(uploaded_file),
+                                          output_format=output_format, progress=report_progress,
+                                          observe=get_drift_monitor().observe_rows))
+
+        try:
+            if release is None:
+                raise ValueError(f"Model not loaded for {family}")
+            with span("batch"):
+                data = export_bytes(score_to, f".{output_format}")
+            metrics.predictions_total.inc(stats["rows"] - stats["invalid_rows"], model=family, source="batch")
+        except ValueError as e:
+            st.error(str(e))
         else:
-            return "Model not loaded", "Model not loaded"
-
-    # Predict button
-    if st.button("Predict"):  
-        soil_quality, industrial_use = predict_soil_quality_industrial_use(texture_input, moisture_input, organic_matter_input, ph_input, conductivity_input)
-        
-        # Save prediction to user history
-        if "prediction_history" not in st.session_state:
-            st.session_state.prediction_history = []
-            
-        st.session_state.prediction_history.append({
-            "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "model": "Logistic Regression",
-            "texture": texture,
-            "moisture": moisture_input,
-            "organic_matter": organic_matter_input,
-            "ph": ph_input,
-            "conductivity": conductivity_input,
-            "soil_quality": soil_quality,
-            "industrial_use": industrial_use
-        })
-        
-        st.success(f"##### 🌱 **Predicted Soil Quality:** {soil_quality}")
-        st.info(f"##### 🏗 **Predicted Industrial Use:** {industrial_use}")
+            progress_text.empty()
+            st.success(f"##### ✅ Scored {stats['rows']:,} rows with model version {release.version} in {stats['seconds']:.2f}s "
+                       f"({stats['rows_per_sec']:,.0f} rows/sec)")
+            if stats["invalid_rows"]:
+                st.warning(f"{stats['invalid_rows']:,} rows had missing or out-of-range values and were marked '{batch.INVALID_LABEL}'.")
+            st.download_button("Download Predictions", data, file_name=f"soil_predictions.{output_format}")
 
 elif page == "Resources":
     st.header("📚 Learning About Soils")
-    
-    with st.expander("##### Introduction to Soil Science"):
-        st.write("Definition of Soil :")
-        st.write("Soil is a natural resource that forms on the Earth's surface. It consists of mineral particles, organic matter, water, and air. Soil is crucial for plant growth, water filtration, and supporting ecosystems.'")
-        st.write("Importance of Soil :")
-        st.write("Soil provides nutrients, water retention, and mechanical support for plants. It also serves as a habitat for diverse organisms, plays a vital role in carbon sequestration, and helps filter water")
-        st.write("Soil and Ecosystem Balance :")
-        st.write("Healthy soil maintains the balance of various ecosystems, sustaining plant life and contributing to biodiversity")
-
-    with st.expander("##### Key Soil Properties"):
-        st.write("Soil Texture :")
-        st.write("Soil texture refers to the proportion of sand, silt, and clay in the soil. It determines how water and air move through the soil and affects plant growth")
-        st.write("pH Levels :")
-        st.write("Soil pH influences nutrient availability for plants. Most plants thrive in neutral to slightly acidic soils (pH 6-7).")
-        st.write("Organic Matter :")
-        st.write("The decayed remains of plants and animals. Organic matter improves soil structure, moisture retention, and nutrient content.")
-        st.write("Soil Moisture :")
-        st.write("The amount of water present in the soil is essential for plant growth. Proper moisture levels promote healthy crops.")
-        st.write("Electrical Conductivity :")
-        st.write("Indicates the level of salts and minerals in the soil, which can affect plant growth if too high.")
-
-    with st.expander("##### Types of Soil"):
-        st.write("**Clay Soil:** Clay particles are small and dense, which makes the soil sticky when wet. It is nutrient-rich but poorly drained.")
-        st.write("**Sandy Soil:** Sandy soil drains quickly and is warm, but it often lacks nutrients and moisture retention.")
-        st.write("**Loamy Soil:** Loam is considered the best soil for most plants, with a balanced texture that holds moisture yet drains well.")
-        st.write("**Peaty Soil:** High in organic material, peat soil retains moisture and is very fertile.")
-        st.write("**Saline Soil:** Contains a high amount of salts, which can negatively affect plant growth. Usually requires specific treatments to make it fertile.")
-
-    with st.expander("##### Soil Fertility and Management"):
-        st.write("**Fertility Factors:** Soil fertility is determined by the availability of essential nutrients like nitrogen, phosphorus, potassium, and other micronutrients.")
-        st.write("**Soil Amendments:** Organic materials such as compost, mulch, and green manure can enhance soil fertility.")
-        st.write("**Soil Erosion:** Soil erosion is caused by wind, water, or human activity and can degrade soil quality. Proper management practices, such as planting cover crops, can prevent erosion.")
-        st.write("**Soil Conservation:** Methods to protect soil from degradation, including contour farming, terracing, and no-till agriculture.")
-
-    with st.expander("##### Importance of Soil in Agriculture"):
-        st.write("**Role in Crop Production:** Soil provides essential nutrients and water to crops. Fertile soil improves yields and ensures the sustainability of agricultural practices.")
-        st.write("**Soil and Irrigation:** Proper soil moisture is essential for irrigation practices. Different soil types require different irrigation techniques to maintain optimal moisture.")
-        st.write("**Soil Testing:** Soil testing helps determine nutrient levels and pH, allowing farmers to amend soil and optimize fertilizer use.")
-        st.write("**Soil and Climate Change:** Soil plays a significant role in climate change by sequestering carbon and affecting greenhouse gas emissions. Sustainable farming practices help mitigate the impacts of climate change.")
-
-    with st.expander("##### Soil and Environmental Sustainability"):
-        st.write("**Soil as a Carbon Sink:** Healthy soils store carbon, which helps mitigate climate change by reducing atmospheric CO2 levels.")
-        st.write("**Soil and Biodiversity:** Soils host a wide range of organisms, from bacteria to insects, which support ecosystems and contribute to biodiversity.")
-        st.write("**Soil Pollution:** Soil can become polluted by chemicals, heavy metals, and industrial waste. Contaminated soils require treatment and restoration to restore their health.")
-
-    with st.expander("##### Recommended Resources"):
-        st.write("### Books")
-        st.write("- *The Nature and Properties of Soils* by Nyle C. Brady")
-        st.write("- *Soil Science Simplified* by Donald H. L. Bracey")
-        st.write("- *Introduction to Soil and Water Conservation Technology* by R. D. Gupta")
-    
-        st.write("### Online Courses")
-        st.write("- [Soil Science Online Course (Coursera)](https://www.coursera.org/learn/soil-science)")
-        st.write("- [Soil Management and Fertility (Udemy)](https://www.udemy.com/course/soil-management/)")
+    for label, content in static_pages.RESOURCES:
+        with st.expander(label):
+            st.markdown(content)
 
 elif page == "Profile":
     st.header("👤 User Profile")
@@ -277,15 +408,35 @@ elif page == "Profile":
     # Prediction History
     st.subheader("Prediction History")
     
-    if "prediction_history" in st.session_state and st.session_state.prediction_history:
-        history_df = pd.DataFrame(st.session_state.prediction_history)
-        st.dataframe(history_df)
-        
-        # Option to download history as CSV
-        csv = history_df.to_csv(index=False)
-        b64 = base64.b64encode(csv.encode()).decode()
-        href = f'<a href="data:file/csv;base64,{b64}" download="prediction_history.csv">Download History as CSV</a>'
-        st.markdown(href, unsafe_allow_html=True)
+    history = get_history_store()
+    filter_col1, filter_col2, filter_col3 = st.columns(3)
+    with filter_col1:
+        history_model = st.selectbox("Model", ["All"] + list(MODEL_FAMILIES.keys()))
+    with filter_col2:
+        history_start = st.date_input("From", value=None)
+    with filter_col3:
+        history_end = st.date_input("To", value=None)
+
+    history_filters = {
+        "model": None if history_model == "All" else history_model,
+        "start": history_start.strftime("%Y-%m-%d 00:00:00") if history_start else None,
+        "end": history_end.strftime("%Y-%m-%d 23:59:59") if history_end else None,
+    }
+    history_count = history.count(st.session_state.username, **history_filters)
+
+    if history_count:
+        # Only the requested page is read from the store
+        page_count = (history_count + HISTORY_PAGE_SIZE - 1) // HISTORY_PAGE_SIZE
+        history_page = st.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count, value=1)
+        st.dataframe(history.page(st.session_state.username, history_page, HISTORY_PAGE_SIZE, **history_filters))
+        st.caption(f"{history_count:,} predictions")
+
+        # Export streams rows from the store into a private temporary file that is deleted once read
+        export_format = st.radio("Export format:", ["csv", "parquet"], horizontal=True)
+        if st.button("Prepare Export"):
+            export = history.export_parquet if export_format == "parquet" else history.export_csv
+            data = export_bytes(lambda path: export(st.session_state.username, path, **history_filters), f".{export_format}")
+            st.download_button(f"Download History as {export_format.upper()}", data, file_name=f"prediction_history.{export_format}")
     else:
         st.info("No prediction history available. Make some predictions to see your history here.")
     
@@ -316,17 +467,12 @@ elif page == "Profile":
                 elif new_password != confirm_new_password:
                     st.error("New passwords do not match.")
                 else:
-                    users = load_users()
-                    username = st.session_state.get("username")
-
-                    if username not in users:
-                        st.error("User not found. Please login again.")
+                    success, message = change_password(st.session_state.get("username"), current_password, new_password)
+                    if success:
+                        st.success(message)
                     else:
-                        # Check if current password matches
-                        if users[username]["password"] != hash_password(current_password):
-                            st.error("Current password is incorrect.")
-                        else:
-                            # Update password and save
-                            users[username]["password"] = hash_password(new_password)
-                            save_users(users)
-                            st.success("Password updated successfully!")
+                        st.error(message)
+
+# Reruns that stop early (login page, st.stop) are covered by their stage spans only
+metrics.stage_latency.observe(time.perf_counter() - rerun_start, stage="rerun", page=page)
+metrics.rerun_cpu.observe(time.thread_time() - rerun_cpu_start, page=page)
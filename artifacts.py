@@ -0,0 +1,205 @@
+import json
+import os
+import pickle
+import subprocess
+import sys
+
+import numpy as np
+
+from models import MODEL_FILES, artifact_file, file_sha256
+from forest import CompiledForest
+
+# File layout: MAGIC, little-endian uint64 header length, JSON header, then the
+# node arrays, each starting on an ALIGNMENT boundary so they can be memory-mapped.
+MAGIC = b"SOILFRST"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+
+# CompiledForest arrays stored in an artifact; each keeps its in-memory dtype,
+# so compacted forests (see compaction.py) stay compact on disk
+ARRAYS = ("feature", "threshold", "left", "right", "is_leaf", "leaf_proba", "roots")
+
+
+def _aligned(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def export_forest(forest, path, source_sha256=None):
+    """Write a RandomForestClassifier or CompiledForest to a memory-mappable artifact.
+
+    source_sha256 is the checksum of the pickle the forest came from; load_engine
+    only maps the artifact while that pickle is unchanged.
+    """
+    if not isinstance(forest, CompiledForest):
+        forest = CompiledForest.from_sklearn(forest)
+
+    arrays = {name: np.ascontiguousarray(getattr(forest, name)) for name in ARRAYS}
+    feature_names = forest.feature_names_in_
+    header = {
+        "format_version": FORMAT_VERSION,
+        "source_sha256": source_sha256,
+        "classes": np.asarray(forest.classes_).tolist(),
+        "feature_names": None if feature_names is None else [str(name) for name in feature_names],
+        "arrays": {},
+    }
+
+    # Array offsets depend on the header length, so lay out against a header padded to alignment
+    offset = 0
+    for name, array in arrays.items():
+        header["arrays"][name] = {"offset": offset, "dtype": array.dtype.str, "shape": list(array.shape)}
+        offset = _aligned(offset + array.nbytes)
+    header_bytes = json.dumps(header).encode()
+    data_start = _aligned(len(MAGIC) + 8 + len(header_bytes))
+
+    # Write to a temporary file and rename, so readers never map a half-written artifact
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(len(header_bytes).to_bytes(8, "little"))
+        f.write(header_bytes)
+        for name, array in arrays.items():
+            f.seek(data_start + header["arrays"][name]["offset"])
+            f.write(array.tobytes())
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_header(path):
+    """Return an artifact's JSON header and its length in bytes"""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a forest artifact")
+        header_length = int.from_bytes(f.read(8), "little")
+        header = json.loads(f.read(header_length))
+    if header["format_version"] != FORMAT_VERSION:
+        raise ValueError(f"Unsupported forest artifact version {header['format_version']}")
+    return header, header_length
+
+
+def load_forest(path):
+    """Map an artifact read-only and return it as a CompiledForest.
+
+    The node arrays stay backed by the file, so every process that loads the
+    same artifact shares its physical pages instead of holding a private copy.
+    """
+    header, header_length = read_header(path)
+    data_start = _aligned(len(MAGIC) + 8 + header_length)
+    arrays = {}
+    for name, spec in header["arrays"].items():
+        shape = tuple(spec["shape"])
+        if not np.prod(shape):
+            arrays[name] = np.empty(shape, dtype=spec["dtype"])
+            continue
+        arrays[name] = np.memmap(path, dtype=spec["dtype"], mode="r", offset=data_start + spec["offset"], shape=shape)
+
+    feature_names = header["feature_names"]
+    return CompiledForest(
+        classes=np.asarray(header["classes"]),
+        feature_names=None if feature_names is None else np.asarray(feature_names, dtype=object),
+        **arrays,
+    )
+
+
+def is_current(artifact_path, pickle_path):
+    """Whether an artifact was exported from the pickle beside it, or stands in for a pickle that is not there"""
+    if not os.path.exists(pickle_path):
+        return True
+    return read_header(artifact_path)[0].get("source_sha256") == file_sha256(pickle_path)
+
+
+def load_engine(name, model_dir=".", use_artifact=True):
+    """Load a model's compiled engine from its artifact, falling back to its pickle.
+
+    An artifact exported from a different pickle (or before artifacts recorded
+    their source) is stale: the pickle has been replaced since, so it is
+    compiled instead. `python artifacts.py export` rewrites such artifacts.
+    """
+    path = os.path.join(model_dir, artifact_file(name))
+    pickle_path = os.path.join(model_dir, MODEL_FILES[name])
+    if use_artifact and os.path.exists(path) and is_current(path, pickle_path):
+        return load_forest(path)
+
+    from forest import compile_models
+    path = pickle_path
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        return compile_models({name: pickle.load(f)})[name]
+
+
+def export_models(model_dir="."):
+    """Export an artifact next to every pickled forest in model_dir"""
+    from sklearn.ensemble import RandomForestClassifier
+
+    written = []
+    for name, filename in MODEL_FILES.items():
+        path = os.path.join(model_dir, filename)
+        if not os.path.exists(path):
+            continue
+        with open(path, "rb") as f:
+            model = pickle.load(f)
+        if isinstance(model, RandomForestClassifier) and getattr(model, "n_outputs_", 1) == 1:
+            written.append(export_forest(model, os.path.join(model_dir, artifact_file(name)), file_sha256(path)))
+    return written
+
+
+# Run in a fresh interpreter so each loader is measured from a cold start
+BENCH_SCRIPT = """
+import sys, time
+start = time.perf_counter()
+sys.path.insert(0, {root!r})
+import numpy as np
+if {loader!r} == "pickle":
+    from models import read_models
+    from forest import compile_models
+    engines = compile_models(read_models({model_dir!r}))
+else:
+    from artifacts import load_engine
+    from models import MODEL_FILES
+    engines = {{name: load_engine(name, {model_dir!r}) for name in MODEL_FILES}}
+    engines = {{name: engine for name, engine in engines.items() if engine is not None}}
+row = np.array([[1, 20.0, 2.5, 7.0, 1.0]])
+for engine in engines.values():
+    engine.predict(row)
+elapsed = time.perf_counter() - start
+status = dict(line.split(":", 1) for line in open("/proc/self/status") if ":" in line)
+print(elapsed, status["RssAnon"].split()[0], status["RssFile"].split()[0], len(engines))
+"""
+
+
+def benchmark(model_dir=".", repeats=3):
+    """Compare cold-start time and resident memory of the pickle and artifact loaders"""
+    root = os.path.dirname(os.path.abspath(__file__))
+    results = {}
+    for loader in ("pickle", "artifact"):
+        runs = []
+        for _ in range(repeats):
+            script = BENCH_SCRIPT.format(root=root, loader=loader, model_dir=model_dir)
+            output = subprocess.run([sys.executable, "-W", "ignore", "-c", script],
+                                    capture_output=True, text=True, check=True).stdout.split()
+            runs.append((float(output[0]), int(output[1]), int(output[2]), int(output[3])))
+        seconds, rss_anon, rss_file, count = min(runs)
+        results[loader] = {"seconds": seconds, "rss_anon_kb": rss_anon, "rss_file_kb": rss_file, "models": count}
+    return results
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    command = argv[0] if argv else "export"
+    model_dir = argv[1] if len(argv) > 1 else "."
+
+    if command == "export":
+        for path in export_models(model_dir):
+            print(f"Wrote {path} ({os.path.getsize(path) / 1e6:.1f} MB)")
+    elif command == "bench":
+        for loader, result in benchmark(model_dir).items():
+            print(f"{loader:>8}: {result['models']} models, cold start {result['seconds'] * 1000:.0f}ms, "
+                  f"private RSS {result['rss_anon_kb'] / 1024:.1f} MB, file-backed RSS {result['rss_file_kb'] / 1024:.1f} MB")
+    else:
+        print("Usage: python artifacts.py [export|bench] [model_dir]", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
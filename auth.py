@@ -1,66 +1,60 @@
 import streamlit as st
-import pickle
-import os
 import hashlib
-import json
-from pathlib import Path
 
-# File to store user credentials
-USER_DB_FILE = "users.pkl"
+from user_store import get_user_store
+from metrics import span
 
 def initialize_user_db():
     """Initialize the user database if it doesn't exist"""
-    if not os.path.exists(USER_DB_FILE):
-        with open(USER_DB_FILE, "wb") as f:
-            pickle.dump({}, f)
+    get_user_store()
 
 def hash_password(password):
     """Create a hashed version of the password"""
     return hashlib.sha256(password.encode()).hexdigest()
 
-def load_users():
-    """Load users from the pickle file"""
-    try:
-        with open(USER_DB_FILE, "rb") as f:
-            return pickle.load(f)
-    except (FileNotFoundError, EOFError):
-        return {}
-
-def save_users(users):
-    """Save users dictionary to pickle file"""
-    with open(USER_DB_FILE, "wb") as f:
-        pickle.dump(users, f)
-
 def register_user(username, password, email):
     """Register a new user"""
-    users = load_users()
+    with span("register"):
+        created = get_user_store().add_user(username, {
+            "password": hash_password(password),
+            "email": email,
+            "created_at": st.session_state.get("current_time", "")
+        })
     
-    # Check if username already exists
-    if username in users:
+    # Username is the primary key, so a taken name fails the insert
+    if not created:
         return False, "Username already exists"
     
-    # Create new user entry
-    users[username] = {
-        "password": hash_password(password),
-        "email": email,
-        "created_at": st.session_state.get("current_time", "")
-    }
-    
-    save_users(users)
     return True, "Registration successful"
 
 def authenticate_user(username, password):
     """Authenticate a user"""
-    users = load_users()
+    with span("authenticate"):
+        user = get_user_store().get_user(username)
+        password_ok = user is not None and user["password"] == hash_password(password)
     
-    if username not in users:
+    if user is None:
         return False, "Invalid username or password"
     
-    if users[username]["password"] != hash_password(password):
+    if not password_ok:
         return False, "Invalid username or password"
     
     return True, "Authentication successful"
 
+def change_password(username, current_password, new_password):
+    """Change a user's password after checking the current one"""
+    store = get_user_store()
+    user = store.get_user(username)
+    
+    if user is None:
+        return False, "User not found. Please login again."
+    
+    if user["password"] != hash_password(current_password):
+        return False, "Current password is incorrect."
+    
+    store.update_password(username, hash_password(new_password))
+    return True, "Password updated successfully!"
+
 def login_page():
     """Display the login page"""
     st.title("Welcome to Soil Condition Predictor – Analyze Your Soil Better")
@@ -178,16 +172,26 @@ def logout():
     
     st.rerun()
 
-def check_authentication():
-    """Check if user is authenticated and handle auth flow"""
+def check_authentication(on_login_page=None):
+    """Check if user is authenticated and handle auth flow.
+
+    on_login_page is called once the login or registration page has rendered.
+    """
+    # Logged-in sessions rerun on every interaction: answer from session state alone,
+    # without touching the user store
+    if st.session_state.get("logged_in"):
+        return True
+
     initialize_auth_state()
-    initialize_user_db()
     
     if not st.session_state.logged_in:
+        initialize_user_db()
         if st.session_state.show_login:
             login_page()
         elif st.session_state.show_register:
             register_page()
+        if on_login_page is not None:
+            on_login_page()
         st.stop()
     
     return True
\ No newline at end of file
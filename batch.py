@@ -0,0 +1,180 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from models import FEATURE_COLUMNS, FEATURE_RANGES, MODEL_FAMILIES, texture_options
+
+# Rows read, scored and written per step
+DEFAULT_CHUNK_SIZE = 50_000
+
+# Label written for rows that fail validation
+INVALID_LABEL = "Invalid input"
+
+
+def detect_format(source):
+    """Guess 'csv' or 'parquet' from a path or uploaded file name"""
+    name = source if isinstance(source, str) else getattr(source, "name", "")
+    if name.lower().endswith((".parquet", ".pq")):
+        return "parquet"
+    return "csv"
+
+
+def iter_chunks(source, chunk_size=DEFAULT_CHUNK_SIZE, file_format=None):
+    """Yield DataFrames of at most chunk_size rows from a CSV or Parquet source"""
+    file_format = file_format or detect_format(source)
+    if file_format == "parquet":
+        import pyarrow.parquet as pq
+        parquet_file = pq.ParquetFile(source)
+        for record_batch in parquet_file.iter_batches(batch_size=chunk_size):
+            yield record_batch.to_pandas()
+    else:
+        yield from pd.read_csv(source, chunksize=chunk_size)
+
+
+def prepare_features(chunk):
+    """Validate and texture-encode a chunk, returning (features, valid_mask)"""
+    missing = [column for column in FEATURE_COLUMNS if column not in chunk.columns]
+    if missing:
+        raise ValueError(f"Missing required columns: {', '.join(missing)}")
+
+    # Texture may arrive as a name ("Sandy Loam") or as its encoded value
+    texture = chunk['Texture']
+    if pd.api.types.is_numeric_dtype(texture):
+        texture_codes = texture.where(texture.isin(list(texture_options.values())))
+    else:
+        texture_codes = texture.astype(str).str.strip().map(texture_options)
+
+    features = pd.DataFrame({'Texture': pd.to_numeric(texture_codes, errors="coerce")}, index=chunk.index)
+    for column in FEATURE_COLUMNS[1:]:
+        features[column] = pd.to_numeric(chunk[column], errors="coerce")
+
+    valid = features.notna().all(axis=1)
+    for column, (low, high) in FEATURE_RANGES.items():
+        valid &= features[column].between(low, high)
+
+    return features.astype("float64"), valid.to_numpy()
+
+
+def get_release(family, model_dir="."):
+    """Load a model family's active release through the model registry, checked against its manifest"""
+    from registry import ModelRegistry
+
+    release = ModelRegistry(model_dir).get(family)
+    if release is None:
+        raise ValueError(f"Model not loaded for {family}")
+    return release
+
+
+def score_chunk(chunk, predictor, observe=None):
+    """Score one chunk for both targets, returning it with label columns added.
+
+    observe, if given, is called with the chunk's valid feature rows, e.g. to
+    update a drift monitor.
+    """
+    features, valid = prepare_features(chunk)
+    if observe is not None and valid.any():
+        observe(features[valid].to_numpy())
+    soil_quality = np.full(len(chunk), INVALID_LABEL, dtype=object)
+    industrial_use = np.full(len(chunk), INVALID_LABEL, dtype=object)
+
+    if valid.any():
+        result = predictor.predict(features[valid])
+        soil_quality[valid] = result["soil_quality"]
+        industrial_use[valid] = result["industrial_use"]
+
+    result = chunk.copy()
+    result["Soil Quality"] = soil_quality
+    result["Industrial Use"] = industrial_use
+    return result, int((~valid).sum())
+
+
+class ChunkWriter:
+    """Append scored chunks to a CSV or Parquet file as they are produced"""
+
+    def __init__(self, destination, file_format=None):
+        self.destination = destination
+        self.file_format = file_format or detect_format(destination)
+        self._handle = None
+        self._parquet_writer = None
+
+    def write(self, frame):
+        if self.file_format == "parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            if self._parquet_writer is None:
+                table = pa.Table.from_pandas(frame, preserve_index=False)
+                self._parquet_writer = pq.ParquetWriter(self.destination, table.schema)
+            else:
+                table = pa.Table.from_pandas(frame, schema=self._parquet_writer.schema, preserve_index=False)
+            self._parquet_writer.write_table(table)
+        else:
+            first = self._handle is None
+            if first:
+                self._handle = open(self.destination, "w", newline="")
+            frame.to_csv(self._handle, header=first, index=False)
+
+    def close(self):
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+        if self._handle is not None:
+            self._handle.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def score_file(source, destination, predictor, chunk_size=DEFAULT_CHUNK_SIZE,
+               input_format=None, output_format=None, progress=None, observe=None):
+    """Stream source through a SoilPredictor (e.g. a registry release's) and write the results to destination"""
+    stats = {"rows": 0, "invalid_rows": 0, "chunks": 0}
+
+    start = time.perf_counter()
+    with ChunkWriter(destination, output_format) as writer:
+        for chunk in iter_chunks(source, chunk_size, input_format):
+            result, invalid_rows = score_chunk(chunk, predictor, observe)
+            writer.write(result)
+
+            stats["rows"] += len(chunk)
+            stats["invalid_rows"] += invalid_rows
+            stats["chunks"] += 1
+            if progress is not None:
+                progress(stats)
+
+    stats["seconds"] = time.perf_counter() - start
+    stats["rows_per_sec"] = stats["rows"] / stats["seconds"] if stats["seconds"] > 0 else 0.0
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch predict soil quality and industrial use from a CSV or Parquet file")
+    parser.add_argument("input", help="CSV or Parquet file with one sample per row")
+    parser.add_argument("output", help="CSV or Parquet file to write predictions to")
+    parser.add_argument("--model", choices=list(MODEL_FAMILIES), default="RandomForest", help="Model family to score with")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Rows processed per chunk")
+    parser.add_argument("--model-dir", default=os.path.dirname(os.path.abspath(__file__)), help="Directory holding the models")
+    args = parser.parse_args(argv)
+
+    def report(stats):
+        print(f"\r{stats['rows']:,} rows scored", end="", file=sys.stderr)
+
+    try:
+        release = get_release(args.model, args.model_dir)
+        stats = score_file(args.input, args.output, release.predictor, args.chunk_size, progress=report)
+    except ValueError as e:
+        print(f"\nError: {e}", file=sys.stderr)
+        return 1
+
+    print(f"\n{stats['rows']:,} rows ({stats['invalid_rows']:,} invalid) in {stats['seconds']:.2f}s "
+          f"- {stats['rows_per_sec']:,.0f} rows/sec with {args.model} {release.version}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,331 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from models import FEATURE_COLUMNS, FEATURE_RANGES, MODEL_FAMILIES, read_models
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+BATCH_SIZES = [1, 10, 100, 1_000, 10_000]
+USER_COUNTS = [100, 1_000, 10_000, 50_000]
+
+# Relative slowdown tolerated by --compare before a metric is reported as a regression
+DEFAULT_THRESHOLD = 0.2
+
+
+def sample_rows(n, seed=0):
+    """Random in-range feature rows"""
+    rng = np.random.default_rng(seed)
+    columns = [rng.integers(0, 4, n).astype(float)]
+    for column in FEATURE_COLUMNS[1:]:
+        low, high = FEATURE_RANGES[column]
+        columns.append(rng.uniform(low, high, n).round(1))
+    return np.column_stack(columns)
+
+
+def summarize(timings):
+    """Latency percentiles in milliseconds"""
+    timings = np.asarray(timings) * 1000
+    return {
+        "p50_ms": float(np.percentile(timings, 50)),
+        "p90_ms": float(np.percentile(timings, 90)),
+        "p99_ms": float(np.percentile(timings, 99)),
+        "mean_ms": float(timings.mean()),
+    }
+
+
+def measure(func):
+    """Run func once, returning (result, seconds, peak traced MB)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, seconds, peak / 1e6
+
+
+def bench_model_load(model_dir):
+    from predictor import load_predictor
+
+    results = {}
+    models, seconds, peak_mb = measure(lambda: read_models(model_dir))
+    results["read_models"] = {"seconds": seconds, "peak_mb": peak_mb, "models": len(models)}
+    for family in MODEL_FAMILIES:
+        predictor, seconds, peak_mb = measure(lambda: load_predictor(family, model_dir))
+        if predictor is not None:
+            results[f"load_predictor[{family}]"] = {"seconds": seconds, "peak_mb": peak_mb}
+    return results
+
+
+def bench_single_row(model_dir, repeats):
+    from predictor import SoilPredictor, load_predictor
+
+    rows = sample_rows(repeats)
+    models = read_models(model_dir)
+    results = {}
+    for family, (soil_key, industrial_key) in MODEL_FAMILIES.items():
+        engines = {"engine": load_predictor(family, model_dir)}
+        if soil_key in models and industrial_key in models:
+            engines["sklearn"] = SoilPredictor(models[soil_key], models[industrial_key])
+        for engine, predictor in engines.items():
+            if predictor is None:
+                continue
+            timings = []
+            for row in rows:
+                start = time.perf_counter()
+                predictor.predict_one(*row)
+                timings.append(time.perf_counter() - start)
+            results[f"{family}/{engine}"] = summarize(timings)
+    return results
+
+
+def bench_batch(model_dir, batch_sizes):
+    from predictor import SoilPredictor, load_predictor
+
+    models = read_models(model_dir)
+    results = {}
+    for family, (soil_key, industrial_key) in MODEL_FAMILIES.items():
+        engines = {"engine": load_predictor(family, model_dir)}
+        if soil_key in models and industrial_key in models:
+            engines["sklearn"] = SoilPredictor(models[soil_key], models[industrial_key])
+        for engine, predictor in engines.items():
+            if predictor is None:
+                continue
+            for batch_size in batch_sizes:
+                rows = sample_rows(batch_size, seed=batch_size)
+                # Repeat small batches so each measurement covers a useful amount of work
+                repeats = max(1, 2_000 // batch_size)
+                start = time.perf_counter()
+                for _ in range(repeats):
+                    predictor.predict(rows)
+                seconds = time.perf_counter() - start
+                results[f"{family}/{engine}/batch={batch_size}"] = {"rows_per_sec": batch_size * repeats / seconds}
+    return results
+
+
+def bench_auth(user_counts, repeats):
+    import auth
+    import user_store
+
+    results = {}
+    password_hash = auth.hash_password("benchmark")
+    for backend, store_class in (("sqlite", user_store.SQLiteUserStore), ("pickle", user_store.PickleUserStore)):
+        for count in user_counts:
+            with tempfile.TemporaryDirectory() as tmp:
+                if backend == "sqlite":
+                    store = store_class(os.path.join(tmp, "users.db"), legacy_pickle=None)
+                    with store._connection() as conn:
+                        conn.executemany("INSERT INTO users (username, password) VALUES (?, ?)",
+                                         ((f"user{i}", password_hash) for i in range(count)))
+                else:
+                    store = store_class(os.path.join(tmp, "users.pkl"))
+                    store._save({f"user{i}": {"password": password_hash} for i in range(count)})
+
+                previous, user_store._store = user_store._store, store
+                try:
+                    timings = []
+                    for i in range(repeats):
+                        start = time.perf_counter()
+                        auth.authenticate_user(f"user{(i * 7919) % count}", "benchmark")
+                        timings.append(time.perf_counter() - start)
+                finally:
+                    user_store._store = previous
+            results[f"{backend}/users={count}"] = summarize(timings)
+    return results
+
+
+def bench_pages(model_dir, repeats):
+    import metrics
+    from streamlit.testing.v1 import AppTest
+
+    results = {}
+    cwd = os.getcwd()
+    os.chdir(model_dir)
+    try:
+        app = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=120)
+        app.session_state["logged_in"] = True
+        app.session_state["username"] = "benchmark"
+        app.session_state["show_login"] = False
+        app.session_state["show_register"] = False
+        app.run()
+        for page in app.sidebar.radio[0].options:
+            app.sidebar.radio[0].set_value(page).run()
+            cpu_before, reruns_before = metrics.rerun_cpu.totals(page=page)
+            timings = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                app.run()
+                timings.append(time.perf_counter() - start)
+            # The app times its own script thread: the CPU each rerun costs the server,
+            # without AppTest's overhead or whatever else the machine is doing
+            cpu, reruns = metrics.rerun_cpu.totals(page=page)
+            results[page] = {**summarize(timings), "cpu_mean_ms": (cpu - cpu_before) / (reruns - reruns_before) * 1000}
+    finally:
+        os.chdir(cwd)
+    return results
+
+
+# Run in a fresh interpreter: render the login page cold, wait while the user would be
+# typing their credentials, then log in and predict on the RandomForest page. The heavy
+# modules are listed when the login page hands over to the model warm-up, whose thread
+# then imports them on purpose, or when the page is done if warm-up is off
+STARTUP_SCRIPT = """
+import sys, time
+sys.path.insert(0, {root!r})
+import registry
+from streamlit.testing.v1 import AppTest
+loaded = []
+warm_up = registry.ModelRegistry.warm_up
+def snapshot_then_warm_up(self):
+    if not loaded:
+        loaded.append([name for name in {heavy!r} if name in sys.modules])
+    return warm_up(self)
+registry.ModelRegistry.warm_up = snapshot_then_warm_up
+app = AppTest.from_file({app!r}, default_timeout=120)
+sys.stderr.write("login-start\\n")
+start = time.perf_counter()
+app.run()
+login = time.perf_counter() - start
+sys.stderr.write("login-end\\n")
+loaded = loaded[0] if loaded else [name for name in {heavy!r} if name in sys.modules]
+time.sleep({think_time!r})
+app.session_state["logged_in"] = True
+app.session_state["username"] = "benchmark"
+app.run()
+start = time.perf_counter()
+app.sidebar.radio[0].set_value("Predict [RandomForest]").run()
+app.button[0].click().run()
+predict = time.perf_counter() - start
+print(login, predict, ",".join(loaded) or "-")
+"""
+
+# Modules whose import at the login page would show up in its first paint
+HEAVY_MODULES = ["numpy", "pandas", "pyarrow", "altair", "sklearn"]
+
+# Seconds a user spends on the login page before submitting
+THINK_TIME = 3.0
+
+
+def _login_import_seconds(importtime_log):
+    """Sum the top-level imports that -X importtime logged while the login page ran"""
+    section = importtime_log.split("login-start\n", 1)[-1].split("login-end\n", 1)[0]
+    total = 0
+    for line in section.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line.split("|")
+            # Nested imports are indented under the import that triggered them
+            if not name[1:].startswith(" "):
+                total += int(cumulative)
+    return total / 1e6
+
+
+def bench_startup(model_dir, repeats, env=None):
+    import subprocess
+
+    script = STARTUP_SCRIPT.format(root=ROOT, app=os.path.join(ROOT, "app.py"), heavy=HEAVY_MODULES, think_time=THINK_TIME)
+    runs = []
+    for _ in range(repeats):
+        completed = subprocess.run([sys.executable, "-W", "ignore", "-X", "importtime", "-c", script],
+                                   capture_output=True, text=True, check=True, cwd=model_dir,
+                                   env={**os.environ, **(env or {})})
+        login, predict, loaded = completed.stdout.split()
+        runs.append((float(login), _login_import_seconds(completed.stderr), float(predict), loaded))
+    login, import_seconds, predict, loaded = min(runs)
+    return {
+        "login_first_paint_seconds": login,
+        "login_import_seconds": import_seconds,
+        "first_predict_seconds": predict,
+        "heavy_modules_at_login": loaded,
+    }
+
+
+def flatten(results, prefix=""):
+    """Flatten nested results into {"section.case.metric": value}"""
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{name}."))
+        elif isinstance(value, float):
+            flat[name] = value
+    return flat
+
+
+def compare(current, baseline, threshold=DEFAULT_THRESHOLD):
+    """Return (metric, baseline, current, change) for every metric that got worse than threshold"""
+    current, baseline = flatten(current["results"]), flatten(baseline["results"])
+    regressions = []
+    for name, value in sorted(current.items()):
+        if name not in baseline or not baseline[name]:
+            continue
+        change = (value - baseline[name]) / baseline[name]
+        # Throughput is better when higher, everything else when lower
+        worse = -change if name.endswith("rows_per_sec") else change
+        if worse > threshold:
+            regressions.append((name, baseline[name], value, change))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark model loading, inference, auth and page reruns")
+    parser.add_argument("--model-dir", default=ROOT, help="Directory holding the models (pages run from here too)")
+    parser.add_argument("--output", default="benchmark_results.json", help="Where to write the JSON results")
+    parser.add_argument("--compare", metavar="BASELINE", help="Saved results to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Tolerated relative slowdown")
+    parser.add_argument("--only", nargs="+", choices=["startup", "load", "single", "batch", "auth", "pages"],
+                        help="Run only these sections")
+    parser.add_argument("--quick", action="store_true", help="Fewer repeats and smaller sizes")
+    args = parser.parse_args(argv)
+
+    sections = set(args.only or ["startup", "load", "single", "batch", "auth", "pages"])
+    repeats = 50 if args.quick else 500
+    model_dir = os.path.abspath(args.model_dir)
+    results = {}
+    if "startup" in sections:
+        results["startup"] = bench_startup(model_dir, 1 if args.quick else 3)
+        print(f"Imported at the login page: {results['startup']['heavy_modules_at_login']}")
+    if "load" in sections:
+        results["model_load"] = bench_model_load(model_dir)
+    if "single" in sections:
+        results["single_row"] = bench_single_row(model_dir, repeats)
+    if "batch" in sections:
+        results["batch"] = bench_batch(model_dir, BATCH_SIZES[:3] if args.quick else BATCH_SIZES)
+    if "auth" in sections:
+        results["auth"] = bench_auth(USER_COUNTS[:2] if args.quick else USER_COUNTS, repeats)
+    if "pages" in sections:
+        results["page_rerun"] = bench_pages(model_dir, 3 if args.quick else 10)
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    for name, value in flatten(results).items():
+        print(f"{name:<70} {value:>14.4f}")
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        for name, old, new, change in regressions:
+            print(f"REGRESSION {name}: {old:.4f} -> {new:.4f} ({change:+.0%})")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.threshold:.0%} against {args.compare}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
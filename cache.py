@@ -0,0 +1,109 @@
+import threading
+import time
+from collections import OrderedDict
+
+# Decimal places each input is rounded to before scoring, matching the predict page widgets:
+# the sliders step by 0.01 and the number inputs show (and accept) two decimals
+FEATURE_DECIMALS = (0, 2, 2, 2, 2)
+
+DEFAULT_MAX_SIZE = 50_000
+DEFAULT_TTL = 3600
+
+
+def quantize(features):
+    """Round a (texture, moisture, organic matter, pH, conductivity) sample to widget precision"""
+    return tuple(round(float(value), decimals) for value, decimals in zip(features, FEATURE_DECIMALS))
+
+
+class PredictionCache:
+    """Thread-safe LRU cache of prediction results with a size bound and TTL.
+
+    Keys are (model id, model version, quantized features). When a model id is
+    seen with a new version, every entry for its previous version is dropped,
+    so a retrained model file never serves stale results.
+    """
+
+    def __init__(self, max_size=DEFAULT_MAX_SIZE, ttl=DEFAULT_TTL, clock=time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def _check_version(self, model_id, model_version):
+        if self._versions.get(model_id, model_version) != model_version:
+            stale = [key for key in self._entries if key[0] == model_id]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+        self._versions[model_id] = model_version
+
+    def get(self, model_id, model_version, features):
+        """Return the cached result for a sample, or None"""
+        key = (model_id, model_version, quantize(features))
+        with self._lock:
+            self._check_version(model_id, model_version)
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > self._clock():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+            return None
+
+    def put(self, model_id, model_version, features, value):
+        """Store a result, evicting the least recently used entry when full"""
+        key = (model_id, model_version, quantize(features))
+        with self._lock:
+            self._check_version(model_id, model_version)
+            self._entries[key] = (self._clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, model_id, model_version, features, compute):
+        """Return the cached result, or call compute(quantized_features) and cache it.
+
+        compute receives the rounded features, so a cached and a freshly
+        computed result for the same key are always identical.
+        """
+        value = self.get(model_id, model_version, features)
+        if value is None:
+            value = compute(quantize(features))
+            self.put(model_id, model_version, features, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+
+    def stats(self):
+        """Return hit/miss counters and the current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+
+# Shared by every Streamlit session in this server process
+prediction_cache = PredictionCache()
@@ -0,0 +1,288 @@
+import argparse
+import json
+import os
+import pickle
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from models import MODEL_FAMILIES, MODEL_FILES, artifact_file, file_sha256
+from forest import CompiledForest, measure_latency
+from artifacts import export_forest, load_forest
+
+# Mean change in a tree's probabilities that --merge-leaves accepts for one merge; see _merge_cost
+DEFAULT_MERGE_TOLERANCE = 0.1
+
+# Settings compared by `report`: label -> compact_forest keyword arguments
+DEFAULT_SETTINGS = {
+    "original": {},
+    "float32 + narrow": {"float32": True, "narrow": True},
+    "merge leaves": {"merge_tolerance": DEFAULT_MERGE_TOLERANCE, "float32": True, "narrow": True},
+    "depth 12": {"max_depth": 12, "float32": True, "narrow": True},
+    "depth 8": {"max_depth": 8, "float32": True, "narrow": True},
+    "50 trees": {"n_trees": 50, "float32": True, "narrow": True},
+    "25 trees": {"n_trees": 25, "float32": True, "narrow": True},
+    "25 trees, depth 8, merged": {"n_trees": 25, "max_depth": 8, "merge_tolerance": DEFAULT_MERGE_TOLERANCE, "float32": True, "narrow": True},
+}
+
+REPORT_BATCH_SIZE = 1_000
+
+
+def _narrow_int(n):
+    """Smallest signed integer dtype that can index n nodes"""
+    for dtype in (np.int16, np.int32):
+        if n <= np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+def _float32_floor(threshold):
+    """Round thresholds down to float32.
+
+    Inputs are compared as float32, and no float32 lies between a threshold and
+    the float32 just below it, so every input still takes the same branch.
+    """
+    rounded = threshold.astype(np.float32)
+    above = rounded.astype(np.float64) > threshold
+    rounded[above] = np.nextafter(rounded[above], np.float32(-np.inf))
+    return rounded
+
+
+def _merge_cost(parent, left, right):
+    """Mean change in a tree's class probabilities if a split's two leaves became one.
+
+    Averaged over the training samples that reach the split, taking each
+    sample's largest per-class change. The parent's distribution is the
+    sample-weighted mix of its children's, which gives the left leaf's share.
+    Leaves of fully grown trees are pure, so a split that separates a few
+    samples costs little while an even split costs a lot.
+    """
+    difference = left - right
+    spread = float(difference @ difference)
+    if spread == 0.0:
+        return 0.0
+    share = min(max(float((parent - right) @ difference) / spread, 0.0), 1.0)
+    return 2.0 * share * (1.0 - share) * float(np.abs(difference).max())
+
+
+def _rebuild_tree(arrays, root, max_depth, merge_tolerance, out):
+    """Append one tree's kept nodes to out in preorder, returning its new root index"""
+    feature, threshold, left, right, is_leaf, proba = arrays
+    new_feature, new_threshold, new_left, new_right, new_proba = out
+
+    def build(node, depth):
+        index = len(new_feature)
+        new_feature.append(0)
+        new_threshold.append(threshold[node])
+        new_left.append(index)
+        new_right.append(index)
+        new_proba.append(node)
+        if is_leaf[node] or (max_depth is not None and depth >= max_depth):
+            # A truncated split keeps the class distribution of every sample that reached it
+            return index
+
+        left_child = build(left[node], depth + 1)
+        right_child = build(right[node], depth + 1)
+        if (merge_tolerance is not None and new_left[left_child] == left_child and new_right[right_child] == right_child
+                and _merge_cost(proba[node], proba[new_proba[left_child]], proba[new_proba[right_child]]) <= merge_tolerance):
+            # The parent becomes a leaf with the distribution of every sample that reached it
+            for column in out:
+                del column[index + 1:]
+            return index
+
+        new_feature[index] = feature[node]
+        new_left[index] = left_child
+        new_right[index] = right_child
+        return index
+
+    return build(root, 0)
+
+
+def compact_forest(forest, n_trees=None, max_depth=None, merge_tolerance=None, float32=False, narrow=False):
+    """Return a smaller CompiledForest.
+
+    n_trees keeps the first n trees (bagged trees are interchangeable),
+    max_depth turns deeper splits into leaves, merge_tolerance collapses sibling
+    leaves whose merge changes the tree's probabilities by at most that much
+    on average (repeatedly, from the bottom up), float32 stores thresholds and leaf
+    probabilities in single precision, and narrow stores node indices in the
+    smallest integer type that fits.
+    """
+    if not isinstance(forest, CompiledForest):
+        forest = CompiledForest.from_sklearn(forest)
+
+    arrays = (forest.feature.tolist(), np.asarray(forest.threshold, dtype=np.float64).tolist(),
+              forest.left.tolist(), forest.right.tolist(), forest.is_leaf.tolist(), np.asarray(forest.leaf_proba))
+    out = ([], [], [], [], [])
+    roots = [_rebuild_tree(arrays, root, max_depth, merge_tolerance, out)
+             for root in forest.roots[:n_trees].tolist()]
+    feature, threshold, left, right, nodes = out
+
+    index_dtype = _narrow_int(len(feature)) if narrow else np.intp
+    threshold = np.asarray(threshold, dtype=np.float64)
+    leaf_proba = arrays[5][nodes]
+    return CompiledForest(
+        feature=np.asarray(feature, dtype=np.int8 if narrow else np.intp),
+        threshold=_float32_floor(threshold) if float32 else threshold,
+        left=np.asarray(left, dtype=index_dtype),
+        right=np.asarray(right, dtype=index_dtype),
+        leaf_proba=leaf_proba.astype(np.float32) if float32 else leaf_proba,
+        roots=np.asarray(roots, dtype=index_dtype),
+        classes=forest.classes_,
+        feature_names=forest.feature_names_in_,
+    )
+
+
+def node_bytes(forest):
+    """Bytes held by the node arrays; an upper bound on what a memory-mapped artifact makes resident"""
+    return sum(np.asarray(getattr(forest, name)).nbytes
+               for name in ("feature", "threshold", "left", "right", "is_leaf", "leaf_proba", "roots"))
+
+
+def evaluate_setting(forest, X, y, reference, repeats=200):
+    """Artifact size, node array size, latency and held-out accuracy of one compacted forest"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = export_forest(forest, os.path.join(tmp, "model.forest"))
+        size = os.path.getsize(path)
+        loaded = load_forest(path)
+
+        predictions = loaded.predict(X)
+        p50, p99 = measure_latency(loaded.predict, X, repeats)
+        batch = X[:REPORT_BATCH_SIZE]
+        start = time.perf_counter()
+        loaded.predict(batch)
+        batch_seconds = time.perf_counter() - start
+
+    return {
+        "trees": int(forest.n_estimators),
+        "nodes": int(len(forest.feature)),
+        "artifact_kb": size / 1024,
+        "node_kb": node_bytes(forest) / 1024,
+        "p50_ms": p50,
+        "p99_ms": p99,
+        "batch_rows_per_sec": len(batch) / batch_seconds,
+        "accuracy": float((predictions == y).mean()),
+        "agreement": float((predictions == reference).mean()),
+    }
+
+
+def report(model, X, y, settings=None, repeats=200):
+    """Evaluate every setting against held-out (X, y); agreement is measured against the uncompacted forest"""
+    settings = DEFAULT_SETTINGS if settings is None else settings
+    original = model if isinstance(model, CompiledForest) else CompiledForest.from_sklearn(model)
+    reference = original.predict(X)
+    return {label: evaluate_setting(compact_forest(original, **kwargs), X, y, reference, repeats)
+            for label, kwargs in settings.items()}
+
+
+def target_for(name):
+    """Name of the training target a model file predicts"""
+    from train import TARGETS
+
+    for pair in MODEL_FAMILIES.values():
+        if name in pair:
+            return next(target for target, (_, position) in TARGETS.items() if pair[position] == name)
+    raise ValueError(f"{name} is not a per-target model")
+
+
+def load_heldout(path, test_size=None):
+    """Read labelled rows; with test_size, keep only the test split train.py holds out of the same CSV"""
+    from train import RANDOM_STATE, load_dataset, split_indices
+
+    X, targets = load_dataset(path)
+    if test_size is not None:
+        _, test_idx = split_indices(len(X), test_size, RANDOM_STATE)
+        X, targets = X[test_idx], {target: y[test_idx] for target, y in targets.items()}
+    return X, targets
+
+
+def record_in_manifest(path, name, settings):
+    """Update the checksum of a rewritten artifact in the manifest beside it, so the model registry accepts it"""
+    manifest_path = os.path.join(os.path.dirname(os.path.abspath(path)), "manifest.json")
+    if not os.path.exists(manifest_path):
+        return
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    entry = manifest["models"].get(name)
+    if entry is None or entry.get("artifact") != os.path.basename(path):
+        return
+    entry["artifact_sha256"] = file_sha256(path)
+    entry["compaction"] = settings
+    tmp_path = f"{manifest_path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+
+
+def _load_model(model_dir, name):
+    with open(os.path.join(model_dir, MODEL_FILES[name]), "rb") as f:
+        return pickle.load(f)
+
+
+def main(argv=None):
+    from sklearn.ensemble import RandomForestClassifier
+
+    parser = argparse.ArgumentParser(description="Compact the random forest models and report the trade-offs")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    report_parser = subparsers.add_parser("report", help="Compare compaction settings on held-out data")
+    report_parser.add_argument("data", help="Labelled CSV in the training format")
+    report_parser.add_argument("--model-dir", default=".")
+    report_parser.add_argument("--model", action="append", choices=list(MODEL_FILES), help="Only report these models")
+    report_parser.add_argument("--test-size", type=float,
+                               help="Score only the test split train.py holds out of data (use the value it trained with)")
+    report_parser.add_argument("--output", default="compaction_report.json")
+
+    compact_parser = subparsers.add_parser("compact", help="Write a compacted artifact for the app to load")
+    compact_parser.add_argument("model", choices=list(MODEL_FILES))
+    compact_parser.add_argument("--model-dir", default=".")
+    compact_parser.add_argument("--trees", type=int, help="Keep only the first N trees")
+    compact_parser.add_argument("--max-depth", type=int, help="Turn splits below this depth into leaves")
+    compact_parser.add_argument("--merge-leaves", type=float, nargs="?", const=DEFAULT_MERGE_TOLERANCE, metavar="TOLERANCE",
+                                help="Collapse sibling leaves whose merge changes the tree's probabilities by at most "
+                                     f"TOLERANCE on average (default {DEFAULT_MERGE_TOLERANCE})")
+    compact_parser.add_argument("--float32", action="store_true", help="Single-precision thresholds and probabilities")
+    compact_parser.add_argument("--narrow", action="store_true", help="Smallest integer type for node indices")
+    compact_parser.add_argument("--output", help="Artifact path (default: the model's artifact in --model-dir)")
+    args = parser.parse_args(argv)
+
+    if args.command == "compact":
+        model = _load_model(args.model_dir, args.model)
+        compacted = compact_forest(model, args.trees, args.max_depth, args.merge_leaves, args.float32, args.narrow)
+        path = export_forest(compacted, args.output or os.path.join(args.model_dir, artifact_file(args.model)),
+                             file_sha256(os.path.join(args.model_dir, MODEL_FILES[args.model])))
+        print(f"Wrote {path}: {compacted.n_estimators} trees, {len(compacted.feature):,} nodes, "
+              f"{os.path.getsize(path) / 1024:.0f} KB")
+        record_in_manifest(path, args.model, {"trees": args.trees, "max_depth": args.max_depth,
+                                              "merge_tolerance": args.merge_leaves, "float32": args.float32,
+                                              "narrow": args.narrow})
+        return 0
+
+    X, targets = load_heldout(args.data, args.test_size)
+    results = {}
+    for name in args.model or MODEL_FILES:
+        if not os.path.exists(os.path.join(args.model_dir, MODEL_FILES[name])):
+            continue
+        model = _load_model(args.model_dir, name)
+        if not isinstance(model, RandomForestClassifier) or getattr(model, "n_outputs_", 1) != 1:
+            continue
+        results[name] = report(model, X, targets[target_for(name)])
+
+        print(f"{name} ({len(X):,} held-out rows)")
+        print(f"  {'setting':<28}{'trees':>6}{'nodes':>9}{'size KB':>9}{'node KB':>9}"
+              f"{'p50 ms':>8}{'rows/s':>10}{'accuracy':>10}{'agree':>8}")
+        for label, row in results[name].items():
+            print(f"  {label:<28}{row['trees']:>6}{row['nodes']:>9,}{row['artifact_kb']:>9.0f}{row['node_kb']:>9.0f}"
+                  f"{row['p50_ms']:>8.3f}{row['batch_rows_per_sec']:>10,.0f}{row['accuracy']:>10.4f}{row['agreement']:>8.4f}")
+
+    with open(args.output, "w") as f:
+        json.dump({"data": os.path.abspath(args.data), "test_size": args.test_size, "rows": int(len(X)),
+                   "models": results}, f, indent=2)
+    print(f"Report written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
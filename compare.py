@@ -0,0 +1,55 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Threads shared by every comparison; model families are scored side by side, one per thread
+COMPARE_THREADS = 4
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """The process-wide thread pool comparisons run on, created on first use"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=COMPARE_THREADS, thread_name_prefix="compare")
+    return _executor
+
+
+def score(release, features):
+    """Score one sample with one release, timing only the model call"""
+    start = time.perf_counter()
+    result = release.predictor.predict([list(features)])
+    seconds = time.perf_counter() - start
+    return {
+        "version": release.version,
+        "soil_quality": result["soil_quality"][0],
+        "industrial_use": result["industrial_use"][0],
+        "soil_quality_proba": dict(zip(result["soil_quality_classes"], result["soil_quality_proba"][0].tolist())),
+        "industrial_use_proba": dict(zip(result["industrial_use_classes"], result["industrial_use_proba"][0].tolist())),
+        "seconds": seconds,
+    }
+
+
+def compare(releases, features, executor=None):
+    """Score one sample with every release concurrently.
+
+    releases maps a model family to its registry Release. Returns the
+    per-family results (in releases order) and the wall time of the whole
+    comparison, which is bounded by the slowest model rather than the sum.
+    Scikit-learn and numpy release the GIL for most of a prediction, so
+    the models overlap on separate cores.
+    """
+    executor = executor or get_executor()
+    start = time.perf_counter()
+    futures = {family: executor.submit(score, release, features) for family, release in releases.items()}
+    results = {}
+    for family, future in futures.items():
+        try:
+            results[family] = future.result()
+        except Exception as e:
+            # One failing model should not hide the others
+            results[family] = {"error": str(e)}
+    return results, time.perf_counter() - start
@@ -0,0 +1,340 @@
+import argparse
+import json
+import math
+import os
+import sys
+import threading
+
+from models import FEATURE_COLUMNS, FEATURE_RANGES, texture_options
+
+# Written next to the models by train.py: the training split summarised as a Profile
+REFERENCE_FILE = "reference_profile.json"
+
+# Equal-width bins across each numeric feature's input range, plus one bin either side for values outside it
+DRIFT_BINS = 20
+
+# Requests summarised per window; scores cover the last full window and the current one
+DEFAULT_WINDOW = 10_000
+
+# Rows needed before drift is scored at all
+MIN_ROWS = 100
+
+# Population stability index bands commonly used for input drift
+PSI_WARNING = 0.1
+PSI_DRIFT = 0.25
+
+NUMERIC_COLUMNS = FEATURE_COLUMNS[1:]
+
+
+class Profile:
+    """Constant-size summary of feature rows.
+
+    Keeps the row count, a Welford running mean and sum of squared deviations
+    and a fixed-bin histogram for every numeric feature, and counts per
+    texture code. Memory does not grow with the rows added, and two profiles
+    merge exactly, so windows can be combined without keeping any rows.
+    """
+
+    def __init__(self, bins=DRIFT_BINS):
+        self.bins = bins
+        self.count = 0
+        self.mean = [0.0] * len(NUMERIC_COLUMNS)
+        self.m2 = [0.0] * len(NUMERIC_COLUMNS)
+        self.histograms = [[0] * (bins + 2) for _ in NUMERIC_COLUMNS]
+        # One slot per texture code, and a last one for codes the models were not trained on
+        self.textures = [0] * (len(texture_options) + 1)
+
+    def _bin(self, column, value):
+        low, high = FEATURE_RANGES[column]
+        if value < low:
+            return 0
+        if value > high:
+            return self.bins + 1
+        return 1 + min(int((value - low) / (high - low) * self.bins), self.bins - 1)
+
+    def add(self, row):
+        """Add one (texture, moisture, organic matter, pH, conductivity) row"""
+        self.count += 1
+        texture = int(row[0])
+        self.textures[texture if 0 <= texture < len(texture_options) else -1] += 1
+        for i, column in enumerate(NUMERIC_COLUMNS):
+            value = float(row[i + 1])
+            delta = value - self.mean[i]
+            self.mean[i] += delta / self.count
+            self.m2[i] += delta * (value - self.mean[i])
+            self.histograms[i][self._bin(column, value)] += 1
+
+    def add_rows(self, X):
+        """Add a feature matrix in one vectorized pass, merging its moments into the running ones"""
+        import numpy as np
+
+        X = np.asarray(X, dtype=np.float64).reshape(-1, len(FEATURE_COLUMNS))
+        if not len(X):
+            return
+        batch = Profile(self.bins)
+        batch.count = len(X)
+        textures = X[:, 0].astype(np.int64)
+        textures[(textures < 0) | (textures >= len(texture_options))] = len(texture_options)
+        batch.textures = np.bincount(textures, minlength=len(texture_options) + 1).tolist()
+        for i, column in enumerate(NUMERIC_COLUMNS):
+            values = X[:, i + 1]
+            batch.mean[i] = float(values.mean())
+            batch.m2[i] = float(((values - batch.mean[i]) ** 2).sum())
+            low, high = FEATURE_RANGES[column]
+            bins = 1 + np.minimum(((values - low) / (high - low) * self.bins).astype(np.int64), self.bins - 1)
+            bins[values < low] = 0
+            bins[values > high] = self.bins + 1
+            batch.histograms[i] = np.bincount(bins, minlength=self.bins + 2).tolist()
+        self.update(batch)
+
+    def update(self, other):
+        """Fold another profile into this one (Chan et al.'s parallel variance update)"""
+        count = self.count + other.count
+        if not count:
+            return
+        for i in range(len(NUMERIC_COLUMNS)):
+            delta = other.mean[i] - self.mean[i]
+            self.m2[i] += other.m2[i] + delta * delta * self.count * other.count / count
+            self.mean[i] += delta * other.count / count
+            self.histograms[i] = [a + b for a, b in zip(self.histograms[i], other.histograms[i])]
+        self.textures = [a + b for a, b in zip(self.textures, other.textures)]
+        self.count = count
+
+    def merged(self, other):
+        """A new profile covering the rows of both"""
+        profile = Profile(self.bins)
+        profile.update(self)
+        profile.update(other)
+        return profile
+
+    def std(self, i):
+        return math.sqrt(self.m2[i] / (self.count - 1)) if self.count > 1 else 0.0
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "bins": self.bins,
+            "ranges": {column: list(FEATURE_RANGES[column]) for column in NUMERIC_COLUMNS},
+            "features": {column: {"mean": self.mean[i], "std": self.std(i), "m2": self.m2[i],
+                                  "histogram": self.histograms[i]}
+                         for i, column in enumerate(NUMERIC_COLUMNS)},
+            "textures": self.textures,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        profile = cls(data["bins"])
+        profile.count = data["count"]
+        for i, column in enumerate(NUMERIC_COLUMNS):
+            feature = data["features"][column]
+            profile.mean[i] = feature["mean"]
+            profile.m2[i] = feature["m2"]
+            profile.histograms[i] = list(feature["histogram"])
+        profile.textures = list(data["textures"])
+        return profile
+
+
+def psi(expected, actual):
+    """Population stability index between two histograms over the same bins"""
+    # Smooth empty bins so a bin seen on only one side adds a large but finite term
+    expected_total, actual_total = sum(expected) + len(expected), sum(actual) + len(actual)
+    score = 0.0
+    for e, a in zip(expected, actual):
+        p, q = (e + 1) / expected_total, (a + 1) / actual_total
+        score += (q - p) * math.log(q / p)
+    return score
+
+
+def drift_status(score):
+    return "drift" if score >= PSI_DRIFT else "warning" if score >= PSI_WARNING else "ok"
+
+
+def compare_profiles(reference, current):
+    """Drift scores of current against reference, per feature.
+
+    Every feature gets its PSI and a status band; numeric features also get
+    the shift of their mean in reference standard deviations (None if the
+    feature was constant in the reference).
+    """
+    if current.count < MIN_ROWS:
+        return {}
+    scores = {}
+    texture_psi = psi(reference.textures, current.textures)
+    scores["Texture"] = {"psi": texture_psi, "status": drift_status(texture_psi)}
+    for i, column in enumerate(NUMERIC_COLUMNS):
+        score = psi(reference.histograms[i], current.histograms[i])
+        std = reference.std(i)
+        shift = current.mean[i] - reference.mean[i]
+        scores[column] = {
+            "psi": score,
+            # Undefined for a feature that was constant in training
+            "mean_shift": shift / std if std > 0 else None,
+            "mean": current.mean[i],
+            "reference_mean": reference.mean[i],
+            "status": drift_status(score),
+        }
+    return scores
+
+
+def save_profile(profile, path):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(profile.to_dict(), f, indent=2)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_profile(path):
+    with open(path) as f:
+        return Profile.from_dict(json.load(f))
+
+
+class DriftMonitor:
+    """Summarises incoming requests and scores them against the training reference.
+
+    Rows are folded into the current window's Profile and dropped. Once a
+    window holds `window` rows it replaces the previous one, so scores always
+    cover between one and two windows of recent traffic in constant memory.
+    The reference profile is re-read when its file changes, e.g. when a
+    retrained release is promoted. The monitor renders its scores as
+    Prometheus gauges when registered with metrics.register().
+    """
+
+    # Registered under one name, so a newer monitor replaces an older one in the metrics
+    name = "soil_input_drift"
+
+    def __init__(self, model_dir=".", window=DEFAULT_WINDOW):
+        self.reference_path = os.path.join(model_dir, REFERENCE_FILE)
+        self.window = window
+        self._current = Profile()
+        self._previous = Profile()
+        self._reference = None
+        self._reference_signature = None
+        self._lock = threading.Lock()
+        self.observed = 0
+
+    def _roll(self):
+        if self._current.count >= self.window:
+            self._previous, self._current = self._current, Profile()
+
+    def observe(self, row):
+        """Add one request's feature row"""
+        with self._lock:
+            self._current.add(row)
+            self.observed += 1
+            self._roll()
+
+    def observe_rows(self, X):
+        """Add many rows at once, e.g. a batch chunk"""
+        profile = Profile()
+        if len(X) <= 16:
+            for row in X:
+                profile.add(row)
+        else:
+            profile.add_rows(X)
+        with self._lock:
+            self._current.update(profile)
+            self.observed += profile.count
+            self._roll()
+
+    def reference(self):
+        """The training reference profile, or None if the model directory has none"""
+        try:
+            stat = os.stat(self.reference_path)
+        except FileNotFoundError:
+            self._reference = self._reference_signature = None
+            return None
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if signature != self._reference_signature:
+            self._reference = load_profile(self.reference_path)
+            self._reference_signature = signature
+        return self._reference
+
+    def recent(self):
+        """Profile of the rows the scores cover"""
+        with self._lock:
+            return self._previous.merged(self._current)
+
+    def scores(self):
+        """Per-feature drift of recent requests; empty until there is a reference and MIN_ROWS rows"""
+        reference = self.reference()
+        if reference is None:
+            return {}
+        return compare_profiles(reference, self.recent())
+
+    def status(self):
+        scores = self.scores()
+        return {
+            "reference": self.reference_path if self._reference is not None else None,
+            "observed": self.observed,
+            "window_rows": self.recent().count,
+            "status": max((score["status"] for score in scores.values()),
+                          key=["ok", "warning", "drift"].index, default="insufficient data"),
+            "features": scores,
+        }
+
+    def render(self):
+        scores = self.scores()
+        lines = ["# HELP soil_input_drift_psi Population stability index of recent inputs against the training data",
+                 "# TYPE soil_input_drift_psi gauge"]
+        lines.extend(f'soil_input_drift_psi{{feature="{column}"}} {score["psi"]}' for column, score in scores.items())
+        lines += ["# HELP soil_input_drift_mean_shift Shift of recent input means, in training standard deviations",
+                  "# TYPE soil_input_drift_mean_shift gauge"]
+        lines.extend(f'soil_input_drift_mean_shift{{feature="{column}"}} {score["mean_shift"]}'
+                     for column, score in scores.items() if score.get("mean_shift") is not None)
+        lines += ["# HELP soil_input_drift_observed_total Input rows seen by the drift monitor",
+                  "# TYPE soil_input_drift_observed_total counter",
+                  f"soil_input_drift_observed_total {self.observed}"]
+        return lines
+
+
+def profile_file(source, chunk_size=None, bins=DRIFT_BINS):
+    """Profile the valid rows of a CSV or Parquet file in chunks, as the batch scorer reads them"""
+    import batch
+
+    profile = Profile(bins)
+    for chunk in batch.iter_chunks(source, chunk_size or batch.DEFAULT_CHUNK_SIZE):
+        features, valid = batch.prepare_features(chunk)
+        profile.add_rows(features[valid].to_numpy())
+    return profile
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Input drift profiles and checks")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    profile_parser = subparsers.add_parser("profile", help="Write a reference profile for models trained before train.py saved one")
+    profile_parser.add_argument("data", help="The training CSV")
+    profile_parser.add_argument("--test-size", type=float, default=0.2, help="Profile only the split train.py trained on")
+    profile_parser.add_argument("--output", default=REFERENCE_FILE)
+
+    check_parser = subparsers.add_parser("check", help="Score a CSV or Parquet file against a reference profile")
+    check_parser.add_argument("data")
+    check_parser.add_argument("--reference", default=REFERENCE_FILE)
+    args = parser.parse_args(argv)
+
+    if args.command == "profile":
+        from train import RANDOM_STATE, load_dataset, split_indices
+
+        X, _ = load_dataset(args.data)
+        train_idx, _ = split_indices(len(X), args.test_size, RANDOM_STATE)
+        profile = Profile()
+        profile.add_rows(X[train_idx])
+        save_profile(profile, args.output)
+        print(f"Profiled {profile.count:,} rows into {args.output}")
+        return 0
+
+    current = profile_file(args.data)
+    scores = compare_profiles(load_profile(args.reference), current)
+    if not scores:
+        print(f"Need at least {MIN_ROWS} valid rows, found {current.count}")
+        return 1
+    print(f"{current.count:,} rows against {args.reference}")
+    for column, score in scores.items():
+        shift = f"{score['mean_shift']:+8.2f} sd" if score.get("mean_shift") is not None else " " * 11
+        print(f"  {column:<32} PSI {score['psi']:.3f} {shift}  {score['status']}")
+    return 2 if any(score["status"] == "drift" for score in scores.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,208 @@
+import sys
+import time
+
+import numpy as np
+
+# Marker sklearn uses for a leaf's child index
+LEAF = -1
+
+# Rows walked at a time, so the walk's (row, tree) index arrays stay at ROW_BLOCK x n_estimators
+# entries however many rows are scored
+ROW_BLOCK = 2048
+
+
+def row_blocks(n_samples, block=ROW_BLOCK):
+    """Yield slices covering n_samples rows, block rows at a time"""
+    for start in range(0, n_samples, block):
+        yield slice(start, min(start + block, n_samples))
+
+
+class CompiledForest:
+    """A RandomForestClassifier flattened into contiguous node arrays.
+
+    Every tree's nodes are stored back to back; child indices are rewritten to
+    point into the shared arrays and each tree's root sits at roots[t]. Leaves
+    hold their normalized class probabilities, so scoring is a level-by-level
+    walk of all trees at once followed by averaging, with no sklearn calls.
+
+    The walk is built for the interactive path (one row, or a few hundred);
+    for very large batches sklearn's Cython traversal is still faster.
+    """
+
+    def __init__(self, feature, threshold, left, right, leaf_proba, roots, classes, feature_names=None, is_leaf=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.is_leaf = left == np.arange(len(left)) if is_leaf is None else is_leaf
+        self.leaf_proba = leaf_proba
+        self.roots = roots
+        self.classes_ = classes
+        self.n_classes_ = len(classes)
+        self.feature_names_in_ = feature_names
+        self.n_estimators = len(roots)
+
+    @classmethod
+    def from_sklearn(cls, forest):
+        """Flatten a fitted RandomForestClassifier"""
+        if getattr(forest, "n_outputs_", 1) != 1:
+            raise ValueError("Only single-output forests can be compiled")
+
+        features, thresholds, lefts, rights, probas, roots = [], [], [], [], [], []
+        offset = 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            is_leaf = tree.children_left == LEAF
+
+            # Leaf probabilities normalized exactly as DecisionTreeClassifier.predict_proba does
+            value = tree.value[:, 0, :forest.n_classes_].astype(np.float64)
+            normalizer = value.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+
+            features.append(np.where(is_leaf, 0, tree.feature).astype(np.intp))
+            thresholds.append(tree.threshold.astype(np.float64))
+            # Leaves point at themselves, which is how the walk recognises them
+            self_index = np.arange(tree.node_count, dtype=np.intp) + offset
+            lefts.append(np.where(is_leaf, self_index, tree.children_left + offset).astype(np.intp))
+            rights.append(np.where(is_leaf, self_index, tree.children_right + offset).astype(np.intp))
+            probas.append(value / normalizer)
+            roots.append(offset)
+            offset += tree.node_count
+
+        return cls(
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds),
+            left=np.concatenate(lefts),
+            right=np.concatenate(rights),
+            leaf_proba=np.concatenate(probas),
+            roots=np.asarray(roots, dtype=np.intp),
+            classes=np.asarray(forest.classes_),
+            feature_names=getattr(forest, "feature_names_in_", None),
+        )
+
+    def _as_array(self, X):
+        # sklearn walks trees on float32 inputs, so cast the same way to get identical splits
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        return X
+
+    def apply(self, X):
+        """Return the flat leaf index reached in every tree, shape (n_samples, n_estimators)"""
+        X = self._as_array(X)
+        leaves = np.empty((X.shape[0], self.n_estimators), dtype=np.intp)
+        for block in row_blocks(X.shape[0]):
+            leaves[block] = self._walk(X[block])
+        return leaves
+
+    def _walk(self, X):
+        n_samples = X.shape[0]
+        # Walk with native-width indices even when the stored node arrays are narrower
+        nodes = np.tile(self.roots.astype(np.intp), n_samples)
+        rows = np.repeat(np.arange(n_samples), self.n_estimators)
+
+        # Only (row, tree) pairs still sitting on a split node are advanced each level
+        active = np.arange(nodes.size)
+        while active.size:
+            current = nodes[active]
+            go_left = X[rows[active], self.feature[current]] <= self.threshold[current]
+            reached = np.where(go_left, self.left[current], self.right[current]).astype(np.intp, copy=False)
+            nodes[active] = reached
+            active = active[~self.is_leaf[reached]]
+        return nodes.reshape(n_samples, self.n_estimators)
+
+    def predict_proba(self, X):
+        """Average the leaf probabilities over all trees, one block of rows at a time"""
+        X = self._as_array(X)
+        proba = np.empty((X.shape[0], self.n_classes_), dtype=np.float64)
+        for block in row_blocks(X.shape[0]):
+            proba[block] = self.proba_from_leaves(self._walk(X[block]))
+        return proba
+
+    def proba_from_leaves(self, leaves):
+        """Average leaf probabilities for leaf indices as returned by apply()"""
+        # Accumulate tree by tree in estimator order to reproduce sklearn's float sums
+        proba = np.zeros((leaves.shape[0], self.n_classes_), dtype=np.float64)
+        for t in range(self.n_estimators):
+            proba += self.leaf_proba[leaves[:, t]]
+        proba /= self.n_estimators
+        return proba
+
+    def predict(self, X):
+        """Return the most probable class for each row"""
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
+
+
+def stack_forests(forests):
+    """Merge compiled forests into one walker whose apply() covers every tree.
+
+    Returns (walker, offsets): the leaves of forests[i] are the columns
+    [sum of previous n_estimators, ...) of walker.apply(X), minus offsets[i].
+    """
+    offsets = np.cumsum([0] + [len(forest.feature) for forest in forests[:-1]])
+    n_classes = max(forest.n_classes_ for forest in forests)
+    walker = CompiledForest(
+        feature=np.concatenate([forest.feature for forest in forests]),
+        threshold=np.concatenate([forest.threshold for forest in forests]),
+        left=np.concatenate([forest.left + offset for forest, offset in zip(forests, offsets)]),
+        right=np.concatenate([forest.right + offset for forest, offset in zip(forests, offsets)]),
+        leaf_proba=np.concatenate([np.pad(forest.leaf_proba, ((0, 0), (0, n_classes - forest.n_classes_)))
+                                   for forest in forests]),
+        roots=np.concatenate([forest.roots + offset for forest, offset in zip(forests, offsets)]),
+        classes=np.arange(n_classes),
+    )
+    return walker, offsets
+
+
+def compile_models(models):
+    """Compile every RandomForestClassifier in a models dict, leaving others untouched"""
+    from sklearn.ensemble import RandomForestClassifier
+
+    compiled = {}
+    for name, model in models.items():
+        if isinstance(model, RandomForestClassifier) and getattr(model, "n_outputs_", 1) == 1:
+            compiled[name] = CompiledForest.from_sklearn(model)
+        else:
+            compiled[name] = model
+    return compiled
+
+
+def measure_latency(predict, rows, repeats=200):
+    """Time single-row calls to predict, returning (p50, p99) in milliseconds"""
+    timings = []
+    for i in range(repeats):
+        row = rows[i % len(rows):i % len(rows) + 1]
+        start = time.perf_counter()
+        predict(row)
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.percentile(timings, 50)), float(np.percentile(timings, 99))
+
+
+def main(argv=None):
+    import pandas as pd
+    from models import FEATURE_COLUMNS, FEATURE_RANGES, read_models
+
+    argv = sys.argv[1:] if argv is None else argv
+    model_dir = argv[0] if argv else "."
+    models = read_models(model_dir)
+
+    rng = np.random.default_rng(0)
+    samples = pd.DataFrame({'Texture': rng.integers(0, 4, 1000).astype(float)})
+    for column, (low, high) in FEATURE_RANGES.items():
+        samples[column] = rng.uniform(low, high, 1000).round(1)
+    samples = samples[FEATURE_COLUMNS]
+
+    for name, model in models.items():
+        compiled = CompiledForest.from_sklearn(model)
+        assert np.array_equal(compiled.predict_proba(samples.to_numpy()), model.predict_proba(samples))
+        assert np.array_equal(compiled.predict(samples.to_numpy()), model.predict(samples))
+
+        sk_p50, sk_p99 = measure_latency(model.predict, samples)
+        c_p50, c_p99 = measure_latency(compiled.predict, samples.to_numpy())
+        print(f"{name}: sklearn p50={sk_p50:.3f}ms p99={sk_p99:.3f}ms | "
+              f"compiled p50={c_p50:.3f}ms p99={c_p99:.3f}ms ({sk_p50 / c_p50:.1f}x at p50)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+import csv
+import sqlite3
+import threading
+
+HISTORY_DB_FILE = "history.db"
+
+# Columns of a history record, in table and export order
+HISTORY_COLUMNS = ["timestamp", "model", "texture", "moisture", "organic_matter", "ph", "conductivity",
+                   "soil_quality", "industrial_use"]
+
+# Rows fetched from SQLite per step while exporting
+EXPORT_BATCH_SIZE = 5000
+
+
+class HistoryStore:
+    """Append-only, per-user prediction history in SQLite.
+
+    Rows are indexed on (username, timestamp) and (username, model, timestamp),
+    so a page of a filtered range is an index scan however long the history is.
+    Exports read through a cursor in batches and never hold the full history.
+    """
+
+    def __init__(self, path=HISTORY_DB_FILE):
+        self.path = path
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS predictions ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT NOT NULL, timestamp TEXT NOT NULL, "
+                "model TEXT NOT NULL, texture TEXT, moisture REAL, organic_matter REAL, ph REAL, "
+                "conductivity REAL, soil_quality TEXT, industrial_use TEXT)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_predictions_user_time ON predictions (username, timestamp)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_predictions_user_model_time "
+                         "ON predictions (username, model, timestamp)")
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def append(self, username, record):
+        """Add one prediction to a user's history"""
+        with self._connection() as conn:
+            conn.execute(
+                f"INSERT INTO predictions (username, {', '.join(HISTORY_COLUMNS)}) "
+                f"VALUES (?, {', '.join('?' for _ in HISTORY_COLUMNS)})",
+                [username] + [record[column] for column in HISTORY_COLUMNS],
+            )
+
+    @staticmethod
+    def _where(username, model=None, start=None, end=None):
+        clauses, params = ["username = ?"], [username]
+        if model is not None:
+            clauses.append("model = ?")
+            params.append(model)
+        if start is not None:
+            clauses.append("timestamp >= ?")
+            params.append(start)
+        if end is not None:
+            clauses.append("timestamp <= ?")
+            params.append(end)
+        return " AND ".join(clauses), params
+
+    def count(self, username, model=None, start=None, end=None):
+        """Count a user's predictions matching the filters"""
+        where, params = self._where(username, model, start, end)
+        return self._connection().execute(f"SELECT COUNT(*) FROM predictions WHERE {where}", params).fetchone()[0]
+
+    def page(self, username, page=1, page_size=25, model=None, start=None, end=None):
+        """Return one page of a user's predictions, newest first"""
+        where, params = self._where(username, model, start, end)
+        rows = self._connection().execute(
+            f"SELECT {', '.join(HISTORY_COLUMNS)} FROM predictions WHERE {where} "
+            f"ORDER BY timestamp DESC, id DESC LIMIT ? OFFSET ?",
+            params + [page_size, (page - 1) * page_size],
+        ).fetchall()
+        return [dict(zip(HISTORY_COLUMNS, row)) for row in rows]
+
+    def iter_batches(self, username, model=None, start=None, end=None, batch_size=EXPORT_BATCH_SIZE):
+        """Yield a user's matching predictions, oldest first, as lists of row tuples"""
+        where, params = self._where(username, model, start, end)
+        # A dedicated connection keeps the read snapshot isolated from writes on this thread's connection
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            cursor = conn.execute(
+                f"SELECT {', '.join(HISTORY_COLUMNS)} FROM predictions WHERE {where} ORDER BY timestamp, id",
+                params,
+            )
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            conn.close()
+
+    def export_csv(self, username, destination, **filters):
+        """Stream matching predictions to a CSV file or text handle, returning the row count"""
+        handle = open(destination, "w", newline="") if isinstance(destination, str) else destination
+        try:
+            writer = csv.writer(handle)
+            writer.writerow(HISTORY_COLUMNS)
+            rows = 0
+            for batch in self.iter_batches(username, **filters):
+                writer.writerows(batch)
+                rows += len(batch)
+            return rows
+        finally:
+            if isinstance(destination, str):
+                handle.close()
+
+    def export_parquet(self, username, destination, **filters):
+        """Stream matching predictions to a Parquet file, one row group per batch"""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = pa.schema([
+            ("timestamp", pa.string()), ("model", pa.string()), ("texture", pa.string()),
+            ("moisture", pa.float64()), ("organic_matter", pa.float64()), ("ph", pa.float64()),
+            ("conductivity", pa.float64()), ("soil_quality", pa.string()), ("industrial_use", pa.string()),
+        ])
+        rows = 0
+        with pq.ParquetWriter(destination, schema) as writer:
+            for batch in self.iter_batches(username, **filters):
+                columns = list(zip(*batch))
+                writer.write_table(pa.Table.from_arrays([pa.array(column, type=field.type)
+                                                         for column, field in zip(columns, schema)], schema=schema))
+                rows += len(batch)
+        return rows
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_history_store():
+    """Return the process-wide history store, creating it on first use"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = HistoryStore()
+    return _store
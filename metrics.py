@@ -0,0 +1,228 @@
+import bisect
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from cache import prediction_cache
+
+# Latency histogram bucket upper bounds, in seconds
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# A session counts as active if it reran within this many seconds
+SESSION_TIMEOUT = 300
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram, one series per label set"""
+
+    def __init__(self, name, help_text, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def totals(self, **labels):
+        """(sum, count) of the values observed with exactly these labels"""
+        with self._lock:
+            series = self._series.get(tuple(sorted(labels.items())))
+            return (series[1], series[2]) if series is not None else (0.0, 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = [(key, list(counts), total, count) for key, (counts, total, count) in self._series.items()]
+        for key, counts, total, count in sorted(snapshot):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(key + (('le', le),))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+
+class Counter:
+    """Monotonic counter, one series per label set"""
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            snapshot = sorted(self._series.items())
+        lines.extend(f"{self.name}{_format_labels(key)} {value}" for key, value in snapshot)
+        return lines
+
+
+class CallbackMetric:
+    """Single value read from a callback when metrics are rendered"""
+
+    def __init__(self, name, help_text, callback, metric_type="gauge"):
+        self.name = name
+        self.help_text = help_text
+        self.callback = callback
+        self.metric_type = metric_type
+
+    def render(self):
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.metric_type}",
+                f"{self.name} {self.callback()}"]
+
+
+stage_latency = Histogram("soil_stage_duration_seconds", "Time spent in each stage of a rerun or request")
+predictions_total = Counter("soil_predictions_total", "Samples scored, by model family and entry point")
+errors_total = Counter("soil_errors_total", "Errors, by stage")
+rerun_cpu = Histogram("soil_rerun_cpu_seconds", "CPU time of the script thread per completed rerun, by page")
+_registry = [stage_latency, predictions_total, errors_total, rerun_cpu]
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def register(metric):
+    """Add a metric to the exported set, replacing any metric already registered under its name"""
+    for i, existing in enumerate(_registry):
+        if existing.name == metric.name:
+            _registry[i] = metric
+            return metric
+    _registry.append(metric)
+    return metric
+
+
+class span:
+    """Time a block into the stage latency histogram, counting it as an error if it raises"""
+
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        stage_latency.observe(time.perf_counter() - self.start, stage=self.stage)
+        # Streamlit's st.stop()/st.rerun() unwind with exceptions that are control flow, not errors
+        if exc_type is not None and exc_type.__module__.split(".")[0] != "streamlit":
+            errors_total.inc(stage=self.stage)
+        return False
+
+
+def mark_session(session_id):
+    """Record that a session just ran"""
+    with _sessions_lock:
+        _sessions[session_id] = time.monotonic()
+
+
+def active_sessions():
+    """Count sessions seen within SESSION_TIMEOUT, forgetting older ones"""
+    cutoff = time.monotonic() - SESSION_TIMEOUT
+    with _sessions_lock:
+        for session_id in [session_id for session_id, seen in _sessions.items() if seen < cutoff]:
+            del _sessions[session_id]
+        return len(_sessions)
+
+
+register(CallbackMetric("soil_active_sessions", f"Sessions that ran in the last {SESSION_TIMEOUT}s", active_sessions))
+register(CallbackMetric("soil_prediction_cache_hits_total", "Prediction cache hits",
+                        lambda: prediction_cache.stats()["hits"], "counter"))
+register(CallbackMetric("soil_prediction_cache_misses_total", "Prediction cache misses",
+                        lambda: prediction_cache.stats()["misses"], "counter"))
+register(CallbackMetric("soil_prediction_cache_entries", "Entries in the prediction cache",
+                        lambda: prediction_cache.stats()["size"]))
+
+
+def render():
+    """Return every metric in Prometheus text exposition format"""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def write_textfile(path):
+    """Atomically write the current metrics to path, e.g. for node_exporter's textfile collector"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(render())
+    os.replace(tmp_path, path)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_exporters_started = False
+_exporters_lock = threading.Lock()
+
+
+def start_exporters(port=None, textfile=None, interval=15):
+    """Start the metrics HTTP endpoint and/or textfile writer once per process.
+
+    Defaults come from SOIL_METRICS_PORT and SOIL_METRICS_FILE; with neither
+    set nothing is started.
+    """
+    global _exporters_started
+    port = port or os.environ.get("SOIL_METRICS_PORT")
+    textfile = textfile or os.environ.get("SOIL_METRICS_FILE")
+    with _exporters_lock:
+        if _exporters_started:
+            return
+        _exporters_started = True
+
+    if port:
+        try:
+            server = ThreadingHTTPServer(("127.0.0.1", int(port)), _MetricsHandler)
+        except OSError:
+            # Another server process already exports on this port
+            server = None
+        if server is not None:
+            threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+
+    if textfile:
+        def write_periodically():
+            while True:
+                write_textfile(textfile)
+                time.sleep(interval)
+        threading.Thread(target=write_periodically, name="metrics-textfile", daemon=True).start()
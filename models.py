@@ -0,0 +1,87 @@
+import hashlib
+import os
+import pickle
+
+# Feature columns the models were trained on, in training order
+FEATURE_COLUMNS = ['Texture', 'Moisture (%)', 'Organic Matter (%)', 'pH', 'Electrical Conductivity (dS/m)']
+
+# Input bounds enforced by the predict page widgets
+FEATURE_RANGES = {
+    'Moisture (%)': (0.0, 100.0),
+    'Organic Matter (%)': (0.0, 10.0),
+    'pH': (0.0, 14.0),
+    'Electrical Conductivity (dS/m)': (0.0, 10.0),
+}
+
+# Texture encoding used by the predict pages
+texture_options = {"Clayey": 0, "Sandy": 1, "Sandy Loam": 2, "Loamy": 3}
+
+# Label decoding for both targets
+soil_quality_mapping = {0: "Poor", 1: "Moderate", 2: "Good"}
+industrial_use_mapping = {0: "Agriculture", 1: "Construction", 2: "Landscaping"}
+
+# Pickled model files, keyed by the name used in the models dict
+MODEL_FILES = {
+    "rf_soil_quality": "rf_soil_quality_model.pkl",
+    "rf_industrial_use": "rf_industrial_use_model.pkl",
+    "rf_soil_quality_LG": "rf_soil_quality_model_LG.pkl",
+    "rf_industrial_use_LG": "rf_industrial_use_model_LG.pkl",
+    "rf_joint": "rf_joint_model.pkl",
+    "rf_joint_LG": "rf_joint_model_LG.pkl",
+}
+
+# Extension of the memory-mappable forest artifacts written by artifacts.py
+ARTIFACT_SUFFIX = ".forest"
+
+# Model family shown in the UI -> (soil quality model, industrial use model)
+MODEL_FAMILIES = {
+    "RandomForest": ("rf_soil_quality", "rf_industrial_use"),
+    "Logistic Regression": ("rf_soil_quality_LG", "rf_industrial_use_LG"),
+}
+
+# Optional multi-output model per family, trained on both targets at once
+JOINT_MODELS = {
+    "RandomForest": "rf_joint",
+    "Logistic Regression": "rf_joint_LG",
+}
+
+
+def read_models(model_dir="."):
+    """Unpickle every model file found in model_dir"""
+    models = {}
+    for name, filename in MODEL_FILES.items():
+        path = os.path.join(model_dir, filename)
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                models[name] = pickle.load(f)
+    return models
+
+
+def artifact_file(name):
+    """Return the forest artifact file name for a model"""
+    return os.path.splitext(MODEL_FILES[name])[0] + ARTIFACT_SUFFIX
+
+
+def model_versions(model_dir="."):
+    """Return an (mtime, size) signature of the pickle and artifact files for every model present"""
+    versions = {}
+    for name, filename in MODEL_FILES.items():
+        signature = []
+        for path in (os.path.join(model_dir, filename), os.path.join(model_dir, artifact_file(name))):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            signature.append((stat.st_mtime_ns, stat.st_size))
+        if signature:
+            versions[name] = tuple(signature)
+    return versions
+
+
+def file_sha256(path):
+    """Hex SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
@@ -0,0 +1,179 @@
+import hashlib
+import os
+import pickle
+import threading
+
+import numpy as np
+import pandas as pd
+
+from models import FEATURE_COLUMNS, MODEL_FAMILIES, MODEL_FILES, JOINT_MODELS, soil_quality_mapping, industrial_use_mapping
+from forest import CompiledForest, row_blocks, stack_forests
+from artifacts import load_engine
+
+# From this many rows sklearn's Cython traversal beats the compiled walk (about 2x at
+# 1,000 rows and 4x at 20,000 on the shipped forest), so bigger batches use the sklearn forests
+BULK_ROWS = 1_000
+
+
+def decode(predictions, mapping):
+    """Map encoded class predictions to their labels"""
+    return np.array([mapping.get(prediction, "Unknown") for prediction in predictions], dtype=object)
+
+
+class SoilPredictor:
+    """Scores soil quality and industrial use together from one feature matrix.
+
+    Accepts either a (soil quality, industrial use) model pair or a single
+    multi-output forest trained on both targets. The input is prepared once
+    and shared by both targets; a pair of compiled forests is walked in a
+    single pass over all their trees. Batches of BULK_ROWS or more go to the
+    SoilPredictor that bulk_loader returns (see sklearn_loader), loaded on the
+    first such batch; the compiled forests keep scoring if it returns None.
+    """
+
+    def __init__(self, soil_model=None, industrial_model=None, joint_model=None, bulk_loader=None):
+        if joint_model is None and (soil_model is None or industrial_model is None):
+            raise ValueError("Need both a soil quality and an industrial use model, or a joint model")
+
+        self.soil_model = soil_model
+        self.industrial_model = industrial_model
+        self.joint_model = joint_model
+
+        # Stacking copies the node arrays, so memory-mapped forests are walked separately to keep sharing their pages
+        self._walker = None
+        forests = [soil_model, industrial_model]
+        if all(isinstance(model, CompiledForest) and not isinstance(model.left, np.memmap) for model in forests):
+            self._walker, self._offsets = stack_forests(forests)
+
+        self._bulk_loader = bulk_loader
+        self._bulk = None
+        self._bulk_lock = threading.Lock()
+
+    def _bulk_predictor(self):
+        if self._bulk_loader is not None:
+            with self._bulk_lock:
+                if self._bulk_loader is not None:
+                    self._bulk, self._bulk_loader = self._bulk_loader(), None
+        return self._bulk
+
+    def __getstate__(self):
+        # Sent to worker processes ready to score large batches; locks and loaders do not pickle
+        self._bulk_predictor()
+        state = self.__dict__.copy()
+        del state["_bulk_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._bulk_lock = threading.Lock()
+
+    def prepare(self, rows):
+        """Return rows as a float feature matrix in FEATURE_COLUMNS order"""
+        if isinstance(rows, pd.DataFrame):
+            return rows[FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+        X = np.asarray(rows, dtype=np.float64)
+        return X.reshape(1, -1) if X.ndim == 1 else X
+
+    def predict_proba(self, rows):
+        """Return (soil quality, industrial use) class probabilities and their classes"""
+        X = self.prepare(rows)
+        if len(X) >= BULK_ROWS and self._bulk_predictor() is not None:
+            return self._bulk.predict_proba(X)
+
+        if self._walker is not None:
+            split = self.soil_model.n_estimators
+            soil_proba = np.empty((len(X), self.soil_model.n_classes_))
+            industrial_proba = np.empty((len(X), self.industrial_model.n_classes_))
+            for block in row_blocks(len(X)):
+                leaves = self._walker.apply(X[block])
+                soil_proba[block] = self.soil_model.proba_from_leaves(leaves[:, :split] - self._offsets[0])
+                industrial_proba[block] = self.industrial_model.proba_from_leaves(leaves[:, split:] - self._offsets[1])
+            return (soil_proba, self.soil_model.classes_), (industrial_proba, self.industrial_model.classes_)
+
+        # sklearn checks feature names, so build the DataFrame once for every model that needs it
+        frame = pd.DataFrame(X, columns=FEATURE_COLUMNS)
+        if self.joint_model is not None:
+            soil_proba, industrial_proba = self.joint_model.predict_proba(frame)
+            soil_classes, industrial_classes = self.joint_model.classes_
+            return (soil_proba, soil_classes), (industrial_proba, industrial_classes)
+
+        return ((self._model_proba(self.soil_model, X, frame), self.soil_model.classes_),
+                (self._model_proba(self.industrial_model, X, frame), self.industrial_model.classes_))
+
+    @staticmethod
+    def _model_proba(model, X, frame):
+        return model.predict_proba(X if isinstance(model, CompiledForest) else frame)
+
+    def predict(self, rows):
+        """Return decoded labels and probabilities for both targets"""
+        (soil_proba, soil_classes), (industrial_proba, industrial_classes) = self.predict_proba(rows)
+        return {
+            "soil_quality": decode(soil_classes.take(soil_proba.argmax(axis=1)), soil_quality_mapping),
+            "industrial_use": decode(industrial_classes.take(industrial_proba.argmax(axis=1)), industrial_use_mapping),
+            "soil_quality_proba": soil_proba,
+            "industrial_use_proba": industrial_proba,
+            "soil_quality_classes": decode(soil_classes, soil_quality_mapping),
+            "industrial_use_classes": decode(industrial_classes, industrial_use_mapping),
+        }
+
+    def predict_one(self, texture, moisture, organic_matter, ph, conductivity):
+        """Return the (soil quality, industrial use) labels for a single sample"""
+        result = self.predict([[texture, moisture, organic_matter, ph, conductivity]])
+        return result["soil_quality"][0], result["industrial_use"][0]
+
+
+def build_predictors(models, bulk_loaders=None):
+    """Create a SoilPredictor for every model family whose models are loaded"""
+    bulk_loaders = bulk_loaders or {}
+    predictors = {}
+    for family, (soil_key, industrial_key) in MODEL_FAMILIES.items():
+        if JOINT_MODELS[family] in models:
+            predictors[family] = SoilPredictor(joint_model=models[JOINT_MODELS[family]])
+        elif soil_key in models and industrial_key in models:
+            predictors[family] = SoilPredictor(models[soil_key], models[industrial_key],
+                                               bulk_loader=bulk_loaders.get(family))
+    return predictors
+
+
+def sklearn_loader(family, engines, model_dir=".", checksums=None):
+    """Return a function that unpickles the sklearn forests behind a family's compiled engines.
+
+    It returns None, leaving the engines to score, if a pickle is missing, no
+    longer matches its SHA-256 in checksums (file name -> digest, as recorded
+    when the engines were loaded), or differs from its engine because the
+    artifact was compacted; large batches then score exactly as small ones.
+    """
+    def load():
+        models = {}
+        for name, engine in engines.items():
+            path = os.path.join(model_dir, MODEL_FILES[name])
+            if not os.path.exists(path):
+                return None
+            with open(path, "rb") as f:
+                data = f.read()
+            if checksums is not None and hashlib.sha256(data).hexdigest() != checksums.get(MODEL_FILES[name]):
+                return None
+            model = pickle.loads(data)
+            if (model.n_estimators != engine.n_estimators or engine.leaf_proba.dtype != np.float64
+                    or sum(tree.tree_.node_count for tree in model.estimators_) != len(engine.feature)):
+                return None
+            models[name] = model
+        return build_predictors(models).get(family)
+    return load
+
+
+def load_predictor(family, model_dir=".", skip_artifacts=(), checksums=None):
+    """Load the engines behind one model family, or return None if they are missing.
+
+    Models named in skip_artifacts are compiled from their pickles even if an
+    artifact exists. A pair of compiled forests also gets a sklearn_loader for
+    large batches, checked against checksums when given.
+    """
+    engines = {name: load_engine(name, model_dir, use_artifact=name not in skip_artifacts)
+               for name in MODEL_FAMILIES[family] + (JOINT_MODELS[family],)}
+    engines = {name: engine for name, engine in engines.items() if engine is not None}
+    forests = {name: engines.get(name) for name in MODEL_FAMILIES[family]}
+    bulk_loaders = {}
+    if JOINT_MODELS[family] not in engines and all(isinstance(engine, CompiledForest) for engine in forests.values()):
+        bulk_loaders[family] = sklearn_loader(family, forests, model_dir, checksums)
+    return build_predictors(engines, bulk_loaders).get(family)
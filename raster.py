@@ -0,0 +1,171 @@
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from models import FEATURE_COLUMNS, FEATURE_RANGES, MODEL_FAMILIES, texture_options
+from models import soil_quality_mapping, industrial_use_mapping
+from batch import get_release
+
+# Cells per tile side; a tile's feature matrix is tile_size² x 5 float64 values
+DEFAULT_TILE_SIZE = 512
+
+# Class code written for cells with missing or out-of-range band values
+NODATA = -1
+
+OUTPUT_SUFFIXES = ("_soil_quality.npy", "_industrial_use.npy")
+
+
+def open_bands(paths):
+    """Memory-map the band arrays, in FEATURE_COLUMNS order.
+
+    paths is either one .npy file holding a (band, row, column) stack or one
+    2D .npy file per band. Nothing is read until a tile is sliced out.
+    """
+    if len(paths) == 1:
+        stack = np.load(paths[0], mmap_mode="r")
+        if stack.ndim != 3 or stack.shape[0] != len(FEATURE_COLUMNS):
+            raise ValueError(f"A single band file must have shape ({len(FEATURE_COLUMNS)}, rows, columns)")
+        bands = list(stack)
+    elif len(paths) == len(FEATURE_COLUMNS):
+        bands = [np.load(path, mmap_mode="r") for path in paths]
+    else:
+        raise ValueError(f"Need one band file per feature ({', '.join(FEATURE_COLUMNS)}) or a single stacked file")
+    if any(band.ndim != 2 or band.shape != bands[0].shape for band in bands):
+        raise ValueError("Every band must be a 2D array of the same shape")
+    return bands
+
+
+def create_outputs(prefix, shape):
+    """Create the soil quality and industrial use class maps as .npy files; every cell is written by its tile"""
+    paths = [prefix + suffix for suffix in OUTPUT_SUFFIXES]
+    for path in paths:
+        np.lib.format.open_memmap(path, mode="w+", dtype=np.int8, shape=shape).flush()
+    return paths
+
+
+def tiles(shape, tile_size=DEFAULT_TILE_SIZE):
+    """Yield (row start, row end, column start, column end) windows covering a raster"""
+    rows, columns = shape
+    for r0 in range(0, rows, tile_size):
+        for c0 in range(0, columns, tile_size):
+            yield r0, min(r0 + tile_size, rows), c0, min(c0 + tile_size, columns)
+
+
+def score_tile(predictor, bands, outputs, window, nodata=None):
+    """Read one tile from every band, score its valid cells and write both class maps; returns the valid cell count"""
+    r0, r1, c0, c1 = window
+    X = np.empty(((r1 - r0) * (c1 - c0), len(FEATURE_COLUMNS)), dtype=np.float64)
+    for i, band in enumerate(bands):
+        X[:, i] = band[r0:r1, c0:c1].ravel()
+
+    valid = np.isfinite(X).all(axis=1) & np.isin(X[:, 0], list(texture_options.values()))
+    if nodata is not None:
+        valid &= (X != nodata).all(axis=1)
+    for i, column in enumerate(FEATURE_COLUMNS[1:], start=1):
+        low, high = FEATURE_RANGES[column]
+        valid &= (X[:, i] >= low) & (X[:, i] <= high)
+
+    soil_quality = np.full(len(X), NODATA, dtype=np.int8)
+    industrial_use = np.full(len(X), NODATA, dtype=np.int8)
+    if valid.any():
+        (soil_proba, soil_classes), (industrial_proba, industrial_classes) = predictor.predict_proba(X[valid])
+        soil_quality[valid] = soil_classes.take(soil_proba.argmax(axis=1))
+        industrial_use[valid] = industrial_classes.take(industrial_proba.argmax(axis=1))
+    outputs[0][r0:r1, c0:c1] = soil_quality.reshape(r1 - r0, c1 - c0)
+    outputs[1][r0:r1, c0:c1] = industrial_use.reshape(r1 - r0, c1 - c0)
+    return int(valid.sum())
+
+
+# Predictor and memory maps opened once in each worker process, rather than sent with every tile
+_worker_data = {}
+
+
+def _init_worker(predictor, band_paths, output_paths, nodata):
+    _worker_data.update(predictor=predictor, bands=open_bands(band_paths),
+                        outputs=[np.load(path, mmap_mode="r+") for path in output_paths], nodata=nodata)
+
+
+def _tile_job(window):
+    data = _worker_data
+    return score_tile(data["predictor"], data["bands"], data["outputs"], window, data["nodata"])
+
+
+def score_raster(band_paths, output_prefix, predictor, tile_size=DEFAULT_TILE_SIZE,
+                 workers=None, nodata=None, progress=None):
+    """Score a banded raster tile by tile and write class maps to <output_prefix>_soil_quality.npy / _industrial_use.npy.
+
+    Only one tile per process is held in memory, whatever the raster size.
+    With workers > 1 tiles are spread over a process pool; every worker maps
+    the same input and output files and writes its tiles in place.
+    """
+    bands = open_bands(band_paths)
+    shape = bands[0].shape
+    output_paths = create_outputs(output_prefix, shape)
+    windows = list(tiles(shape, tile_size))
+    stats = {"cells": 0, "valid_cells": 0, "tiles": 0, "total_tiles": len(windows)}
+
+    start = time.perf_counter()
+    if workers is not None and workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(predictor, band_paths, output_paths, nodata)) as pool:
+            results = zip(windows, pool.map(_tile_job, windows))
+            stats = _collect(results, stats, progress)
+    else:
+        outputs = [np.load(path, mmap_mode="r+") for path in output_paths]
+        results = ((window, score_tile(predictor, bands, outputs, window, nodata)) for window in windows)
+        stats = _collect(results, stats, progress)
+        for output in outputs:
+            output.flush()
+
+    stats["seconds"] = time.perf_counter() - start
+    stats["cells_per_sec"] = stats["cells"] / stats["seconds"] if stats["seconds"] > 0 else 0.0
+    stats["outputs"] = output_paths
+    return stats
+
+
+def _collect(results, stats, progress):
+    for (r0, r1, c0, c1), valid_cells in results:
+        stats["cells"] += (r1 - r0) * (c1 - c0)
+        stats["valid_cells"] += valid_cells
+        stats["tiles"] += 1
+        if progress is not None:
+            progress(stats)
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a gridded soil-sensor raster into soil quality and industrial use maps")
+    parser.add_argument("bands", nargs="+",
+                        help=f"One .npy file per band ({', '.join(FEATURE_COLUMNS)}), or one (band, row, column) stack")
+    parser.add_argument("--output-prefix", required=True, help="Class maps are written to PREFIX_soil_quality.npy and PREFIX_industrial_use.npy")
+    parser.add_argument("--model", choices=list(MODEL_FAMILIES), default="RandomForest", help="Model family to score with")
+    parser.add_argument("--tile-size", type=int, default=DEFAULT_TILE_SIZE, help="Cells per tile side")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: score in this process)")
+    parser.add_argument("--nodata", type=float, help="Band value that marks a missing cell")
+    parser.add_argument("--model-dir", default=os.path.dirname(os.path.abspath(__file__)), help="Directory holding the models")
+    args = parser.parse_args(argv)
+
+    def report(stats):
+        print(f"\r{stats['tiles']:,}/{stats['total_tiles']:,} tiles scored", end="", file=sys.stderr)
+
+    try:
+        release = get_release(args.model, args.model_dir)
+        stats = score_raster(args.bands, args.output_prefix, release.predictor,
+                             args.tile_size, args.workers, args.nodata, progress=report)
+    except ValueError as e:
+        print(f"\nError: {e}", file=sys.stderr)
+        return 1
+
+    print(f"\n{stats['cells']:,} cells ({stats['cells'] - stats['valid_cells']:,} no data) in {stats['seconds']:.2f}s "
+          f"- {stats['cells_per_sec']:,.0f} cells/sec", file=sys.stderr)
+    print(f"Wrote {', '.join(stats['outputs'])} (no data = {NODATA}; soil quality {soil_quality_mapping}, "
+          f"industrial use {industrial_use_mapping})", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,192 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+from models import MODEL_FAMILIES, MODEL_FILES, JOINT_MODELS, artifact_file, file_sha256
+from metrics import span
+
+# Written by `train.py --promote` next to the models it describes
+MANIFEST_FILE = "manifest.json"
+
+# Seconds between checks of the model directory for changed files
+DEFAULT_POLL_INTERVAL = 5.0
+
+
+class Release:
+    """One loaded model family: its predictor and the files, checksums and version it came from"""
+
+    def __init__(self, family, predictor, version, checksums, entries):
+        self.family = family
+        self.predictor = predictor
+        self.version = version
+        self.checksums = checksums
+        self.entries = entries
+        self.loaded_at = time.time()
+
+    def accuracy(self):
+        """Held-out accuracy per target recorded in the manifest, if any"""
+        return {entry["target"]: entry["metrics"]["accuracy"]
+                for entry in self.entries.values() if "metrics" in entry and "target" in entry}
+
+
+class ModelRegistry:
+    """Tracks the model files behind each family and hot-swaps retrained ones.
+
+    A family is loaded on first use. After that, a watcher thread compares the
+    files' (mtime, size) signatures every poll_interval seconds. When they
+    change, the new files are checked against the manifest's checksums and
+    loaded while the old release keeps serving. The swap is a single dict
+    assignment, so a caller holding a Release finishes on that version and
+    the next get() returns the new one.
+    """
+
+    def __init__(self, model_dir=".", poll_interval=DEFAULT_POLL_INTERVAL):
+        self.model_dir = model_dir
+        self.poll_interval = poll_interval
+        self._releases = {}
+        self._signatures = {}
+        self._rejected = {}
+        self._load_lock = threading.Lock()
+        self._watcher = None
+        self._warm_up = None
+        self._stopped = threading.Event()
+        self.reloads = 0
+        self.errors = {}
+
+    def _family_files(self, family):
+        files = []
+        for name in MODEL_FAMILIES[family] + (JOINT_MODELS[family],):
+            files.extend((name, filename) for filename in (MODEL_FILES[name], artifact_file(name)))
+        return files
+
+    def _signature(self, family):
+        signature = []
+        for _, filename in self._family_files(family) + [(None, MANIFEST_FILE)]:
+            try:
+                stat = os.stat(os.path.join(self.model_dir, filename))
+            except FileNotFoundError:
+                continue
+            signature.append((filename, stat.st_mtime_ns, stat.st_size))
+        return tuple(signature)
+
+    def manifest(self):
+        """The manifest in model_dir, or None"""
+        try:
+            with open(os.path.join(self.model_dir, MANIFEST_FILE)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _load(self, family):
+        from predictor import load_predictor
+
+        signature = self._signature(family)
+        manifest = self.manifest() or {"models": {}}
+        entries = {name: manifest["models"][name] for name in MODEL_FAMILIES[family] + (JOINT_MODELS[family],)
+                   if name in manifest["models"]}
+
+        # An artifact the manifest leaves out of a model entry it does list is not part of that release
+        skip_artifacts = {name for name, entry in entries.items() if entry.get("artifact") != artifact_file(name)}
+
+        checksums = {}
+        for name, filename in self._family_files(family):
+            path = os.path.join(self.model_dir, filename)
+            if not os.path.exists(path) or (name in skip_artifacts and filename == artifact_file(name)):
+                continue
+            checksums[filename] = file_sha256(path)
+            entry = entries.get(name, {})
+            expected = entry.get("sha256") if filename == entry.get("file") else entry.get("artifact_sha256")
+            if expected is not None and expected != checksums[filename]:
+                raise ValueError(f"{filename} does not match the checksum in manifest {manifest.get('version')}")
+
+        with span("model_load"):
+            predictor = load_predictor(family, self.model_dir, skip_artifacts, checksums)
+        if self._signature(family) != signature:
+            raise RuntimeError(f"Model files for {family} changed while loading")
+
+        # Versions are named after the files' contents, prefixed by the release that produced them
+        # when the manifest covers every file, so a rewritten artifact still gets a new version
+        digest = hashlib.sha256("".join(sorted(checksums.values())).encode()).hexdigest()
+        managed = {filename for entry in entries.values() for filename in (entry.get("file"), entry.get("artifact"))}
+        version = f"{manifest['version']}/{digest[:8]}" if entries and set(checksums) <= managed else digest[:12]
+        release = Release(family, predictor, version, checksums, entries) if predictor is not None else None
+        return release, signature
+
+    def _install(self, family):
+        release, signature = self._load(family)
+        self._signatures[family] = signature
+        # One assignment: readers see the old release or the new one, never a mix
+        self._releases[family] = release
+        self.errors.pop(family, None)
+
+    def get(self, family):
+        """Return the family's current Release, loading it on first use; None if its models are missing"""
+        if family not in self._releases:
+            with self._load_lock:
+                if family not in self._releases:
+                    self._install(family)
+        return self._releases[family]
+
+    def check(self):
+        """Reload every loaded family whose files changed, returning the families swapped in"""
+        swapped = []
+        for family in list(self._releases):
+            signature = self._signature(family)
+            if signature in (self._signatures.get(family), self._rejected.get(family)):
+                continue
+            with self._load_lock:
+                try:
+                    self._install(family)
+                except Exception as e:
+                    # Keep serving the old release until the files change again
+                    self._rejected[family] = signature
+                    self.errors[family] = str(e)
+                    continue
+            self.reloads += 1
+            swapped.append(family)
+        return swapped
+
+    def _watch(self):
+        while not self._stopped.wait(self.poll_interval):
+            self.check()
+
+    def start(self):
+        """Start the watcher thread (once) and return self"""
+        if self._watcher is None:
+            self._watcher = threading.Thread(target=self._watch, name="model-registry", daemon=True)
+            self._watcher.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+
+    def warm_up(self):
+        """Load every family on a background thread (once), so the first get() does not wait"""
+        def load_all():
+            for family in MODEL_FAMILIES:
+                try:
+                    self.get(family)
+                except Exception as e:
+                    # get() retries and raises on the caller's thread
+                    self.errors[family] = str(e)
+
+        if self._warm_up is None:
+            self._warm_up = threading.Thread(target=load_all, name="model-warmup", daemon=True)
+            self._warm_up.start()
+        return self._warm_up
+
+    def status(self):
+        """Version, checksums and last reload error of every family seen so far"""
+        status = {}
+        for family in MODEL_FAMILIES:
+            release = self._releases.get(family)
+            status[family] = {
+                "loaded": release is not None,
+                "version": release.version if release is not None else None,
+                "loaded_at": release.loaded_at if release is not None else None,
+                "checksums": release.checksums if release is not None else {},
+                "error": self.errors.get(family),
+            }
+        return status
@@ -0,0 +1,119 @@
+# Content of the static pages as prebuilt markdown: each rerun renders a few blocks
+# built once per process instead of one element per line
+
+# Home page, below its header
+HOME = """\
+##### This web Application predicts soil quality and its potential industrial use based on key parameters such as texture, moisture, organic matter, pH, and electrical conductivity.
+
+### 📌 **How It Works:**
+
+##### 1️⃣ **Navigate to the Predict page using the sidebar.**
+
+##### 2️⃣ **Enter the required soil parameters.**
+
+##### 3️⃣ **Click Predict to get the results.**
+
+### Let's get started! 🚀"""
+
+# About Us page, below its header
+ABOUT_US = """\
+### Who We Are
+
+##### We are a team of developers who developed this app to help farmers, agronomists, and industrialists understand the soil quality and its potential uses in different sectors.
+
+##### Our mission is to provide reliable AI-driven predictions for optimal soil management and industrial use.
+
+### Our Goal:
+
+##### To empower industries and agriculture with insights on soil quality and its suitability for different industrial uses.
+
+### Real-World Impact
+
+##### This app has already helped several farmers optimize soil management practices, reduce costs, and enhance productivity. We're constantly working to improve the accuracy of our models and add new features that will help a wider range of industries.
+
+### Contact Us
+
+##### We value your feedback! Feel free to reach out to us for any inquiries or suggestions. Stay connected:
+
+##### [Email Us](mailto:contact@soilpredictions.com)
+
+Follow us on  [LinkedIn](https://www.linkedin.com/) | [Twitter](https://twitter.com/)"""
+
+# Resources page: (expander label, markdown) per section
+RESOURCES = [
+    ('##### Introduction to Soil Science', """\
+Definition of Soil :
+
+Soil is a natural resource that forms on the Earth's surface. It consists of mineral particles, organic matter, water, and air. Soil is crucial for plant growth, water filtration, and supporting ecosystems.'
+
+Importance of Soil :
+
+Soil provides nutrients, water retention, and mechanical support for plants. It also serves as a habitat for diverse organisms, plays a vital role in carbon sequestration, and helps filter water
+
+Soil and Ecosystem Balance :
+
+Healthy soil maintains the balance of various ecosystems, sustaining plant life and contributing to biodiversity"""),
+    ('##### Key Soil Properties', """\
+Soil Texture :
+
+Soil texture refers to the proportion of sand, silt, and clay in the soil. It determines how water and air move through the soil and affects plant growth
+
+pH Levels :
+
+Soil pH influences nutrient availability for plants. Most plants thrive in neutral to slightly acidic soils (pH 6-7).
+
+Organic Matter :
+
+The decayed remains of plants and animals. Organic matter improves soil structure, moisture retention, and nutrient content.
+
+Soil Moisture :
+
+The amount of water present in the soil is essential for plant growth. Proper moisture levels promote healthy crops.
+
+Electrical Conductivity :
+
+Indicates the level of salts and minerals in the soil, which can affect plant growth if too high."""),
+    ('##### Types of Soil', """\
+**Clay Soil:** Clay particles are small and dense, which makes the soil sticky when wet. It is nutrient-rich but poorly drained.
+
+**Sandy Soil:** Sandy soil drains quickly and is warm, but it often lacks nutrients and moisture retention.
+
+**Loamy Soil:** Loam is considered the best soil for most plants, with a balanced texture that holds moisture yet drains well.
+
+**Peaty Soil:** High in organic material, peat soil retains moisture and is very fertile.
+
+**Saline Soil:** Contains a high amount of salts, which can negatively affect plant growth. Usually requires specific treatments to make it fertile."""),
+    ('##### Soil Fertility and Management', """\
+**Fertility Factors:** Soil fertility is determined by the availability of essential nutrients like nitrogen, phosphorus, potassium, and other micronutrients.
+
+**Soil Amendments:** Organic materials such as compost, mulch, and green manure can enhance soil fertility.
+
+**Soil Erosion:** Soil erosion is caused by wind, water, or human activity and can degrade soil quality. Proper management practices, such as planting cover crops, can prevent erosion.
+
+**Soil Conservation:** Methods to protect soil from degradation, including contour farming, terracing, and no-till agriculture."""),
+    ('##### Importance of Soil in Agriculture', """\
+**Role in Crop Production:** Soil provides essential nutrients and water to crops. Fertile soil improves yields and ensures the sustainability of agricultural practices.
+
+**Soil and Irrigation:** Proper soil moisture is essential for irrigation practices. Different soil types require different irrigation techniques to maintain optimal moisture.
+
+**Soil Testing:** Soil testing helps determine nutrient levels and pH, allowing farmers to amend soil and optimize fertilizer use.
+
+**Soil and Climate Change:** Soil plays a significant role in climate change by sequestering carbon and affecting greenhouse gas emissions. Sustainable farming practices help mitigate the impacts of climate change."""),
+    ('##### Soil and Environmental Sustainability', """\
+**Soil as a Carbon Sink:** Healthy soils store carbon, which helps mitigate climate change by reducing atmospheric CO2 levels.
+
+**Soil and Biodiversity:** Soils host a wide range of organisms, from bacteria to insects, which support ecosystems and contribute to biodiversity.
+
+**Soil Pollution:** Soil can become polluted by chemicals, heavy metals, and industrial waste. Contaminated soils require treatment and restoration to restore their health."""),
+    ('##### Recommended Resources', """\
+### Books
+
+- *The Nature and Properties of Soils* by Nyle C. Brady
+- *Soil Science Simplified* by Donald H. L. Bracey
+- *Introduction to Soil and Water Conservation Technology* by R. D. Gupta
+
+### Online Courses
+
+- [Soil Science Online Course (Coursera)](https://www.coursera.org/learn/soil-science)
+- [Soil Management and Fertility (Udemy)](https://www.udemy.com/course/soil-management/)"""),
+]
@@ -0,0 +1,64 @@
+import numpy as np
+
+from models import FEATURE_COLUMNS, FEATURE_RANGES, soil_quality_mapping, industrial_use_mapping
+from predictor import decode
+
+# Features that can be swept: the numeric inputs, over their slider ranges
+SWEEP_COLUMNS = FEATURE_COLUMNS[1:]
+
+DEFAULT_POINTS = 100
+
+
+def axis_values(column, points=DEFAULT_POINTS):
+    """Evenly spaced values across a feature's input range"""
+    low, high = FEATURE_RANGES[column]
+    return np.linspace(low, high, points)
+
+
+def build_grid(fixed, x_column, y_column=None, points=DEFAULT_POINTS):
+    """Return (X, x, y): one feature row per grid point, with the unswept features held at fixed.
+
+    fixed maps every unswept column to its value. Two-feature grids are laid
+    out x-major, so row i * len(y) + j holds (x[i], y[j]).
+    """
+    x = axis_values(x_column, points)
+    y = axis_values(y_column, points) if y_column is not None else None
+    n = len(x) * (len(y) if y is not None else 1)
+
+    X = np.empty((n, len(FEATURE_COLUMNS)), dtype=np.float64)
+    for i, column in enumerate(FEATURE_COLUMNS):
+        if column not in (x_column, y_column):
+            X[:, i] = fixed[column]
+    if y is None:
+        X[:, FEATURE_COLUMNS.index(x_column)] = x
+    else:
+        X[:, FEATURE_COLUMNS.index(x_column)] = np.repeat(x, len(y))
+        X[:, FEATURE_COLUMNS.index(y_column)] = np.tile(y, len(x))
+    return X, x, y
+
+
+def sweep(predictor, fixed, x_column, y_column=None, points=DEFAULT_POINTS):
+    """Score a one- or two-feature grid with a single predict_proba call.
+
+    Probabilities come back shaped (len(x), n_classes), or
+    (len(x), len(y), n_classes) for two features, with the decoded class
+    labels alongside.
+    """
+    X, x, y = build_grid(fixed, x_column, y_column, points)
+    (soil_proba, soil_classes), (industrial_proba, industrial_classes) = predictor.predict_proba(X)
+    shape = (len(x),) if y is None else (len(x), len(y))
+    return {
+        "x_column": x_column,
+        "y_column": y_column,
+        "x": x,
+        "y": y,
+        "rows": len(X),
+        "Soil Quality": (soil_proba.reshape(shape + (-1,)), decode(soil_classes, soil_quality_mapping)),
+        "Industrial Use": (industrial_proba.reshape(shape + (-1,)), decode(industrial_classes, industrial_use_mapping)),
+    }
+
+
+def class_boundaries(values, labels):
+    """Points along a 1D sweep where the predicted class changes, as (value, from, to)"""
+    changes = np.flatnonzero(labels[1:] != labels[:-1])
+    return [((values[i] + values[i + 1]) / 2, labels[i], labels[i + 1]) for i in changes]
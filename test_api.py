@@ -0,0 +1,72 @@
+import json
+import os
+import pickle
+import time
+
+import pytest
+
+pytest.importorskip("starlette")
+pytest.importorskip("httpx")
+from starlette.testclient import TestClient
+
+from api import create_app
+from models import FEATURE_COLUMNS, MODEL_FAMILIES, MODEL_FILES
+
+SAMPLE = {"texture": "Loamy", "moisture": 20, "organic_matter": 2.5, "ph": 7.0, "conductivity": 1.0}
+
+
+def write_models(model_dir, family):
+    """Fit a small forest per target on random rows and pickle it under the family's model names"""
+    import numpy as np
+    import pandas as pd
+    from sklearn.ensemble import RandomForestClassifier
+
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(np.column_stack([rng.integers(0, 4, 300), rng.uniform(0, 100, 300), rng.uniform(0, 10, 300),
+                                      rng.uniform(0, 14, 300), rng.uniform(0, 10, 300)]), columns=FEATURE_COLUMNS)
+    for name in MODEL_FAMILIES[family]:
+        model = RandomForestClassifier(n_estimators=5, random_state=0).fit(X, rng.integers(0, 3, 300))
+        with open(os.path.join(model_dir, MODEL_FILES[name]), "wb") as f:
+            pickle.dump(model, f)
+
+
+def test_predict(tmp_path):
+    write_models(tmp_path, "RandomForest")
+    with TestClient(create_app(str(tmp_path))) as client:
+        response = client.post("/predict", json={"model": "RandomForest", **SAMPLE})
+        assert response.status_code == 200
+        assert response.json()["soil_quality"] in ("Poor", "Moderate", "Good")
+
+        response = client.post("/predict", json={"model": "RandomForest", "samples": [SAMPLE, {**SAMPLE, "ph": 5.5}]})
+        assert len(response.json()["predictions"]) == 2
+
+        assert client.post("/predict", json={**SAMPLE, "ph": 15}).status_code == 422
+        assert client.post("/predict", json={**SAMPLE, "model": "Unknown"}).status_code == 400
+        assert client.post("/predict", json={**SAMPLE, "model": "Logistic Regression"}).status_code == 503
+
+
+def test_family_added_after_startup(tmp_path):
+    with TestClient(create_app(str(tmp_path))) as client:
+        assert client.post("/predict", json=SAMPLE).status_code == 503
+        write_models(tmp_path, "RandomForest")
+        # The registry notices the new files on its next poll
+        deadline = time.monotonic() + 30
+        while client.post("/predict", json=SAMPLE).status_code != 200:
+            assert time.monotonic() < deadline
+            time.sleep(0.2)
+        assert "RandomForest" in client.get("/health").json()["models"]
+
+
+def test_bad_checksum_only_disables_its_family(tmp_path):
+    write_models(tmp_path, "RandomForest")
+    write_models(tmp_path, "Logistic Regression")
+    name = MODEL_FAMILIES["RandomForest"][0]
+    with open(tmp_path / "manifest.json", "w") as f:
+        json.dump({"version": "test", "models": {name: {"file": MODEL_FILES[name], "sha256": "0" * 64}}}, f)
+
+    with TestClient(create_app(str(tmp_path))) as client:
+        response = client.post("/predict", json=SAMPLE)
+        assert response.status_code == 503
+        assert "checksum" in response.json()["error"]
+        assert client.post("/predict", json={**SAMPLE, "model": "Logistic Regression"}).status_code == 200
+        assert "checksum" in client.get("/health").json()["models"]["RandomForest"]["load_error"]
@@ -0,0 +1,281 @@
+import argparse
+import itertools
+import json
+import os
+import pickle
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from models import FEATURE_COLUMNS, MODEL_FAMILIES, MODEL_FILES, artifact_file, file_sha256
+from models import texture_options, soil_quality_mapping, industrial_use_mapping
+
+# Target column -> (label mapping used by the app, index into MODEL_FAMILIES pairs)
+TARGETS = {
+    "Soil Quality": (soil_quality_mapping, 0),
+    "Industrial Use": (industrial_use_mapping, 1),
+}
+
+# Hyperparameter grid searched for each model family
+PARAM_GRIDS = {
+    "RandomForest": {"n_estimators": [100, 200], "max_depth": [None, 20], "min_samples_leaf": [1, 2]},
+    "Logistic Regression": {"C": [0.1, 1.0, 10.0]},
+}
+
+RANDOM_STATE = 42
+READ_CHUNK_SIZE = 500_000
+
+# Compact on-disk dtypes; labels are read as categories and encoded per chunk
+CSV_DTYPES = {
+    'Texture': "category",
+    'Moisture (%)': np.float32,
+    'Organic Matter (%)': np.float32,
+    'pH': np.float32,
+    'Electrical Conductivity (dS/m)': np.float32,
+    "Soil Quality": "category",
+    "Industrial Use": "category",
+}
+
+
+def encode_labels(values, mapping, column):
+    """Encode label strings with an app mapping, rejecting labels it does not know"""
+    codes = {label: code for code, label in mapping.items()}
+    encoded = values.astype(str).map(codes)
+    if encoded.isna().any():
+        unknown = sorted(set(values[encoded.isna()].astype(str)))
+        raise ValueError(f"Unknown {column} values: {', '.join(unknown)}")
+    return encoded.to_numpy(dtype=np.int8)
+
+
+def load_dataset(path, sample_frac=None, chunk_size=READ_CHUNK_SIZE):
+    """Read the training CSV in chunks with compact dtypes.
+
+    Features come back as one float32 matrix and targets as int8 codes, encoded
+    with the same mappings the app decodes with. sample_frac keeps a random
+    fraction of each chunk, so datasets larger than memory can still be used.
+    """
+    rng = np.random.default_rng(RANDOM_STATE)
+    features, targets = [], {target: [] for target in TARGETS}
+    for chunk in pd.read_csv(path, usecols=list(CSV_DTYPES), dtype=CSV_DTYPES, chunksize=chunk_size):
+        if sample_frac is not None:
+            chunk = chunk[rng.random(len(chunk)) < sample_frac]
+        chunk = chunk.dropna()
+
+        texture = encode_labels(chunk['Texture'], {code: name for name, code in texture_options.items()}, 'Texture')
+        features.append(np.column_stack([texture.astype(np.float32)] +
+                                        [chunk[column].to_numpy(np.float32) for column in FEATURE_COLUMNS[1:]]))
+        for target, (mapping, _) in TARGETS.items():
+            targets[target].append(encode_labels(chunk[target], mapping, target))
+
+    X = np.concatenate(features) if features else np.empty((0, len(FEATURE_COLUMNS)), dtype=np.float32)
+    return X, {target: np.concatenate(values) for target, values in targets.items()}
+
+
+def split_indices(n, test_size, seed):
+    """Shuffle and split row indices into (train, test)"""
+    order = np.random.default_rng(seed).permutation(n)
+    n_test = int(round(n * test_size))
+    return order[n_test:], order[:n_test]
+
+
+def build_model(family, params):
+    if family == "RandomForest":
+        from sklearn.ensemble import RandomForestClassifier
+        return RandomForestClassifier(random_state=RANDOM_STATE, n_jobs=1, **params)
+    from sklearn.linear_model import LogisticRegression
+    return LogisticRegression(max_iter=200, random_state=RANDOM_STATE, **params)
+
+
+def resample(X, y, balance):
+    """Rebalance classes the way model.ipynb did, with SMOTE"""
+    if balance != "smote":
+        return X, y
+    try:
+        from imblearn.over_sampling import SMOTE
+    except ImportError:
+        raise SystemExit("SMOTE needs imbalanced-learn: pip install imbalanced-learn (or use --balance none)")
+    return SMOTE(random_state=RANDOM_STATE).fit_resample(X, y)
+
+
+# Training data handed to each worker process once, rather than with every job
+_worker_data = {}
+
+
+def _init_worker(fit, train, X_val, y_val):
+    _worker_data.update(fit=fit, train=train, X_val=X_val, y_val=y_val)
+
+
+def _frame(X):
+    return pd.DataFrame(X, columns=FEATURE_COLUMNS)
+
+
+def _search_job(family, target, params):
+    """Fit one candidate on the fit split and score it on the validation split"""
+    data = _worker_data
+    X_fit, y_fit = data["fit"][target]
+    model = build_model(family, params)
+    start = time.perf_counter()
+    model.fit(_frame(X_fit), y_fit)
+    seconds = time.perf_counter() - start
+    accuracy = float((model.predict(_frame(data["X_val"])) == data["y_val"][target]).mean())
+    return family, target, params, accuracy, seconds
+
+
+def _final_job(family, target, params):
+    """Refit the chosen candidate on the full training split"""
+    X_train, y_train = _worker_data["train"][target]
+    model = build_model(family, params)
+    start = time.perf_counter()
+    model.fit(_frame(X_train), y_train)
+    return family, target, params, model, time.perf_counter() - start
+
+
+def evaluate(model, X, y, mapping):
+    """Held-out accuracy and per-class recall"""
+    predictions = model.predict(_frame(X))
+    recall = {mapping[code]: float((predictions[y == code] == code).mean()) for code in mapping if (y == code).any()}
+    return {"accuracy": float((predictions == y).mean()), "recall": recall, "test_rows": int(len(y))}
+
+
+def train(data_path, output_dir, families=None, test_size=0.2, val_size=0.2, sample_frac=None,
+          balance="smote", workers=None, log=print):
+    """Run the search, refit and evaluate every (family, target) model, and write a versioned release"""
+    families = families or list(MODEL_FAMILIES)
+    start = time.perf_counter()
+
+    X, targets = load_dataset(data_path, sample_frac)
+    log(f"Loaded {len(X):,} rows ({X.nbytes / 1e6:.1f} MB of features) in {time.perf_counter() - start:.1f}s")
+
+    # Same split for both targets, as in model.ipynb
+    train_idx, test_idx = split_indices(len(X), test_size, RANDOM_STATE)
+    fit_idx, val_idx = np.split(train_idx, [len(train_idx) - int(round(len(train_idx) * val_size))])
+
+    # Resampled once per target and split, not again for every candidate
+    start_resample = time.perf_counter()
+    fit_sets = {target: resample(X[fit_idx], y[fit_idx], balance) for target, y in targets.items()}
+    train_sets = {target: resample(X[train_idx], y[train_idx], balance) for target, y in targets.items()}
+    y_val = {target: y[val_idx] for target, y in targets.items()}
+    if balance == "smote":
+        log(f"Resampled with {balance} in {time.perf_counter() - start_resample:.1f}s")
+
+    jobs = [(family, target, dict(zip(PARAM_GRIDS[family], values)))
+            for family in families for target in TARGETS
+            for values in itertools.product(*PARAM_GRIDS[family].values())]
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(fit_sets, train_sets, X[val_idx], y_val)) as pool:
+        best = {}
+        for family, target, params, accuracy, seconds in pool.map(_search_job, *zip(*jobs)):
+            log(f"  {family} / {target} {params}: validation accuracy {accuracy:.4f} ({seconds:.1f}s)")
+            if (family, target) not in best or accuracy > best[(family, target)][1]:
+                best[(family, target)] = (params, accuracy)
+
+        chosen = [(family, target, params) for (family, target), (params, _) in best.items()]
+        final = list(pool.map(_final_job, *zip(*chosen)))
+
+    version = time.strftime("%Y%m%d-%H%M%S")
+    release_dir = os.path.join(output_dir, version)
+    os.makedirs(release_dir)
+    manifest = {
+        "version": version,
+        "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "dataset": {"path": os.path.abspath(data_path), "sha256": file_sha256(data_path), "rows": int(len(X)),
+                    "sample_frac": sample_frac},
+        "split": {"test_size": test_size, "val_size": val_size, "random_state": RANDOM_STATE},
+        "balance": balance,
+        "models": {},
+    }
+
+    for family, target, params, model, seconds in final:
+        mapping, position = TARGETS[target]
+        name = MODEL_FAMILIES[family][position]
+        path = os.path.join(release_dir, MODEL_FILES[name])
+        with open(path, "wb") as f:
+            pickle.dump(model, f)
+        entry = {
+            "file": MODEL_FILES[name],
+            "family": family,
+            "target": target,
+            "estimator": type(model).__name__,
+            "params": params,
+            "validation_accuracy": best[(family, target)][1],
+            "metrics": evaluate(model, X[test_idx], targets[target][test_idx], mapping),
+            "train_seconds": seconds,
+            "sha256": file_sha256(path),
+        }
+
+        from sklearn.ensemble import RandomForestClassifier
+        if isinstance(model, RandomForestClassifier):
+            from artifacts import export_forest
+            artifact_path = export_forest(model, os.path.join(release_dir, artifact_file(name)), entry["sha256"])
+            entry["artifact"] = os.path.basename(artifact_path)
+            entry["artifact_sha256"] = file_sha256(artifact_path)
+
+        manifest["models"][name] = entry
+        log(f"{name}: test accuracy {entry['metrics']['accuracy']:.4f}, trained in {seconds:.1f}s")
+
+    # What the models were fitted on, summarised for the drift monitor (before any resampling)
+    from drift import REFERENCE_FILE, Profile, save_profile
+    reference = Profile()
+    reference.add_rows(X[train_idx])
+    reference_path = save_profile(reference, os.path.join(release_dir, REFERENCE_FILE))
+    manifest["reference_profile"] = {"file": REFERENCE_FILE, "sha256": file_sha256(reference_path),
+                                     "rows": reference.count}
+
+    manifest["total_seconds"] = time.perf_counter() - start
+    with open(os.path.join(release_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return release_dir, manifest
+
+
+def promote(release_dir, model_dir="."):
+    """Copy a release's model files and manifest into the directory the app loads from"""
+    with open(os.path.join(release_dir, "manifest.json")) as f:
+        manifest = json.load(f)
+    for entry in manifest["models"].values():
+        for key in ("file", "artifact"):
+            if key in entry:
+                # Copy then rename, so the app never sees a partially written file
+                tmp_path = os.path.join(model_dir, entry[key] + ".tmp")
+                shutil.copyfile(os.path.join(release_dir, entry[key]), tmp_path)
+                os.replace(tmp_path, os.path.join(model_dir, entry[key]))
+    if "reference_profile" in manifest:
+        filename = manifest["reference_profile"]["file"]
+        tmp_path = os.path.join(model_dir, filename + ".tmp")
+        shutil.copyfile(os.path.join(release_dir, filename), tmp_path)
+        os.replace(tmp_path, os.path.join(model_dir, filename))
+    # The manifest goes last: a model registry watching model_dir checks the new files against it
+    tmp_path = os.path.join(model_dir, "manifest.json.tmp")
+    shutil.copyfile(os.path.join(release_dir, "manifest.json"), tmp_path)
+    os.replace(tmp_path, os.path.join(model_dir, "manifest.json"))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the soil quality and industrial use models")
+    parser.add_argument("data", help="Training CSV with feature columns plus 'Soil Quality' and 'Industrial Use'")
+    parser.add_argument("--output-dir", default="releases", help="Directory to write versioned releases to")
+    parser.add_argument("--family", action="append", choices=list(MODEL_FAMILIES), help="Only train these families")
+    parser.add_argument("--test-size", type=float, default=0.2, help="Held-out fraction for the reported metrics")
+    parser.add_argument("--val-size", type=float, default=0.2, help="Fraction of the training split used to pick parameters")
+    parser.add_argument("--sample-frac", type=float, help="Train on a random fraction of the rows")
+    parser.add_argument("--balance", choices=["smote", "none"], default="smote", help="Class rebalancing of the training split")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: one per core)")
+    parser.add_argument("--promote", action="store_true", help="Copy the new models into the app's model directory")
+    parser.add_argument("--model-dir", default=".", help="Model directory used by --promote")
+    args = parser.parse_args(argv)
+
+    release_dir, manifest = train(args.data, args.output_dir, args.family, args.test_size, args.val_size,
+                                  args.sample_frac, args.balance, args.workers)
+    print(f"Release {manifest['version']} written to {release_dir} in {manifest['total_seconds']:.1f}s")
+    if args.promote:
+        promote(release_dir, args.model_dir)
+        print(f"Promoted {manifest['version']} to {os.path.abspath(args.model_dir)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
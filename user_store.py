@@ -0,0 +1,174 @@
+import abc
+import os
+import pickle
+import sqlite3
+import threading
+
+# Backend used by get_user_store(), "sqlite" or "pickle"
+USER_STORE_BACKEND = os.environ.get("SOIL_USER_STORE", "sqlite")
+SQLITE_DB_FILE = "users.db"
+PICKLE_DB_FILE = "users.pkl"
+
+
+class UserStore(abc.ABC):
+    """Interface for user account storage"""
+
+    @abc.abstractmethod
+    def get_user(self, username):
+        """Return the user's record dict, or None"""
+
+    @abc.abstractmethod
+    def add_user(self, username, record):
+        """Create a user, returning False if the username is taken"""
+
+    @abc.abstractmethod
+    def update_password(self, username, password_hash):
+        """Replace a user's password hash, returning False if the user does not exist"""
+
+    @abc.abstractmethod
+    def count(self):
+        """Return the number of users"""
+
+
+class PickleUserStore(UserStore):
+    """The original whole-file store: every call reads, and every write rewrites, the full dict"""
+
+    def __init__(self, path=PICKLE_DB_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        if not os.path.exists(path):
+            self._save({})
+
+    def _load(self):
+        try:
+            with open(self.path, "rb") as f:
+                return pickle.load(f)
+        except (FileNotFoundError, EOFError):
+            return {}
+
+    def _save(self, users):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(users, f)
+        os.replace(tmp_path, self.path)
+
+    def get_user(self, username):
+        return self._load().get(username)
+
+    def add_user(self, username, record):
+        with self._lock:
+            users = self._load()
+            if username in users:
+                return False
+            users[username] = dict(record)
+            self._save(users)
+            return True
+
+    def update_password(self, username, password_hash):
+        with self._lock:
+            users = self._load()
+            if username not in users:
+                return False
+            users[username]["password"] = password_hash
+            self._save(users)
+            return True
+
+    def count(self):
+        return len(self._load())
+
+
+class SQLiteUserStore(UserStore):
+    """SQLite-backed store with an indexed username lookup and single-row writes.
+
+    Runs in WAL mode so logins keep reading while another thread or process
+    writes. Each thread gets its own connection. On first use, users from the
+    legacy users.pkl are imported in one transaction.
+    """
+
+    def __init__(self, path=SQLITE_DB_FILE, legacy_pickle=PICKLE_DB_FILE):
+        self.path = path
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS users ("
+                "username TEXT PRIMARY KEY, password TEXT NOT NULL, email TEXT, created_at TEXT)"
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        if legacy_pickle and os.path.exists(legacy_pickle):
+            self._migrate_pickle(legacy_pickle)
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _migrate_pickle(self, legacy_pickle):
+        conn = self._connection()
+        # BEGIN IMMEDIATE serializes concurrent first starts, so only one process imports
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            done = conn.execute("SELECT 1 FROM meta WHERE key = 'migrated_pickle'").fetchone()
+            if not done:
+                try:
+                    with open(legacy_pickle, "rb") as f:
+                        users = pickle.load(f)
+                except EOFError:
+                    users = {}
+                conn.executemany(
+                    "INSERT OR IGNORE INTO users (username, password, email, created_at) VALUES (?, ?, ?, ?)",
+                    [(username, record["password"], record.get("email"), record.get("created_at"))
+                     for username, record in users.items()],
+                )
+                conn.execute("INSERT INTO meta (key, value) VALUES ('migrated_pickle', ?)", (legacy_pickle,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def get_user(self, username):
+        row = self._connection().execute(
+            "SELECT password, email, created_at FROM users WHERE username = ?", (username,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {"password": row[0], "email": row[1], "created_at": row[2]}
+
+    def add_user(self, username, record):
+        try:
+            with self._connection() as conn:
+                conn.execute(
+                    "INSERT INTO users (username, password, email, created_at) VALUES (?, ?, ?, ?)",
+                    (username, record["password"], record.get("email"), record.get("created_at")),
+                )
+        except sqlite3.IntegrityError:
+            return False
+        return True
+
+    def update_password(self, username, password_hash):
+        with self._connection() as conn:
+            cursor = conn.execute("UPDATE users SET password = ? WHERE username = ?", (password_hash, username))
+        return cursor.rowcount == 1
+
+    def count(self):
+        return self._connection().execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_user_store():
+    """Return the process-wide user store, creating it on first use"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                if USER_STORE_BACKEND == "pickle":
+                    _store = PickleUserStore()
+                else:
+                    _store = SQLiteUserStore()
+    return _store
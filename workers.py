@@ -0,0 +1,350 @@
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from multiprocessing.connection import Client, Listener
+
+from models import MODEL_FAMILIES
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Requests a worker may have in flight before callers are turned away
+DEFAULT_MAX_INFLIGHT = 4
+# Seconds to wait for a free slot, then for a worker's reply
+DEFAULT_QUEUE_TIMEOUT = 0.5
+DEFAULT_TIMEOUT = 5.0
+# Seconds between health checks, which also restart workers that exited
+HEALTH_INTERVAL = 2.0
+# Seconds before restarting a worker that exited again without becoming healthy, doubling up to the maximum
+RESPAWN_BACKOFF = 0.5
+MAX_RESPAWN_BACKOFF = 30.0
+
+# The pool passes each worker the key that authenticates its socket connections here
+AUTHKEY_ENV = "SOIL_WORKER_AUTHKEY"
+
+
+class WorkerPoolError(RuntimeError):
+    """The pool could not serve a request: all workers busy, none healthy, or a worker failed"""
+
+
+def _handle(conn, registry, stats):
+    """Answer one client connection's requests until it closes"""
+    with conn:
+        while True:
+            try:
+                request = conn.recv()
+            except (EOFError, OSError):
+                return
+            try:
+                if request[0] == "ping":
+                    status = registry.status()
+                    response = ("ok", {"pid": os.getpid(), "served": stats["served"],
+                                       "versions": {family: status[family]["version"] for family in status},
+                                       "errors": {family: status[family]["error"] for family in status
+                                                  if status[family]["error"]}})
+                elif request[0] == "predict":
+                    _, family, rows = request
+                    release = registry.get(family)
+                    if release is None:
+                        response = ("error", f"Model not loaded for {family}")
+                    else:
+                        result = release.predictor.predict(rows)
+                        stats["served"] += len(rows)
+                        response = ("ok", (release.version, result))
+                else:
+                    response = ("error", f"Unknown request {request[0]!r}")
+            except Exception as e:
+                response = ("error", str(e))
+            try:
+                conn.send(response)
+            except OSError:
+                # The client gave up on this request and closed the connection
+                return
+
+
+def _exit_with_parent(parent_pid):
+    while os.getppid() == parent_pid:
+        time.sleep(1.0)
+    os._exit(0)
+
+
+def serve(address, model_dir=".", authkey=None):
+    """Run one worker: load every model family once, then answer requests on a Unix socket"""
+    from registry import ModelRegistry
+
+    registry = ModelRegistry(model_dir).start()
+    for family in MODEL_FAMILIES:
+        try:
+            registry.get(family)
+        except Exception as e:
+            # One family's bad files must not take the others down; ping reports the error, and
+            # predict retries the load and answers ("error", ...) while it keeps failing
+            registry.errors[family] = str(e)
+    threading.Thread(target=_exit_with_parent, args=(os.getppid(),), daemon=True).start()
+
+    if os.path.exists(address):
+        os.unlink(address)
+    listener = Listener(address, "AF_UNIX", authkey=authkey)
+    stats = {"served": 0}
+    while True:
+        try:
+            conn = listener.accept()
+        except OSError:
+            # Includes failed authentication
+            continue
+        threading.Thread(target=_handle, args=(conn, registry, stats), daemon=True).start()
+
+
+class _Worker:
+    def __init__(self, index, address):
+        self.index = index
+        self.address = address
+        self.process = None
+        self.healthy = False
+        self.inflight = 0
+        self.served = 0
+        self.failures = 0
+        self.restarts = 0
+        self.backoff = 0.0
+        self.respawn_at = 0.0
+        self.idle = []
+
+
+class WorkerPool:
+    """Local worker processes that score predictions outside the Streamlit process.
+
+    Each worker loads the models once and listens on its own Unix socket in a
+    private directory. Requests go to the healthy worker with the fewest in
+    flight. With max_inflight requests queued on every worker, callers wait at
+    most queue_timeout for a slot before WorkerPoolError is raised, so they
+    can fall back to scoring in-process instead of piling up.
+    """
+
+    def __init__(self, workers=None, model_dir=".", max_inflight=DEFAULT_MAX_INFLIGHT,
+                 queue_timeout=DEFAULT_QUEUE_TIMEOUT, timeout=DEFAULT_TIMEOUT, health_interval=HEALTH_INTERVAL):
+        self.model_dir = os.path.abspath(model_dir)
+        self.queue_timeout = queue_timeout
+        self.timeout = timeout
+        self.health_interval = health_interval
+        self._socket_dir = tempfile.mkdtemp(prefix="soil-workers-")
+        self._authkey = os.urandom(32)
+        self._workers = [_Worker(i, os.path.join(self._socket_dir, f"worker-{i}.sock"))
+                         for i in range(workers or os.cpu_count() or 1)]
+        self._slots = threading.BoundedSemaphore(len(self._workers) * max_inflight)
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self.rejected = 0
+        self.timeouts = 0
+
+    def _spawn(self, worker):
+        worker.process = subprocess.Popen(
+            [sys.executable, os.path.join(ROOT, "workers.py"), "serve", worker.address, "--model-dir", self.model_dir],
+            env={**os.environ, AUTHKEY_ENV: self._authkey.hex()},
+            stdout=subprocess.DEVNULL,
+        )
+        worker.healthy = False
+        # Pooled connections went to the previous process; drop them rather than fail a request on each
+        with self._lock:
+            idle, worker.idle = worker.idle, []
+        for conn in idle:
+            conn.close()
+
+    def start(self):
+        """Spawn the workers and the health checker; workers serve once their first health check passes"""
+        for worker in self._workers:
+            self._spawn(worker)
+        threading.Thread(target=self._check_health, name="worker-pool-health", daemon=True).start()
+        return self
+
+    def wait_ready(self, timeout=60.0):
+        """Block until every worker is healthy, returning False on timeout"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if all(worker.healthy for worker in self._workers):
+                return True
+            time.sleep(0.05)
+        return False
+
+    def stop(self):
+        self._stopped.set()
+        for worker in self._workers:
+            if worker.process is not None and worker.process.poll() is None:
+                worker.process.terminate()
+        for worker in self._workers:
+            if worker.process is not None:
+                worker.process.wait()
+        shutil.rmtree(self._socket_dir, ignore_errors=True)
+
+    def _check_health(self):
+        while not self._stopped.is_set():
+            for worker in self._workers:
+                if worker.process.poll() is not None:
+                    now = time.monotonic()
+                    if now < worker.respawn_at:
+                        continue
+                    worker.restarts += 1
+                    self._spawn(worker)
+                    # Reset once the worker passes a health check
+                    worker.backoff = min(max(worker.backoff * 2, RESPAWN_BACKOFF), MAX_RESPAWN_BACKOFF)
+                    worker.respawn_at = now + worker.backoff
+                    continue
+                try:
+                    self._request(worker, ("ping",), self.timeout)
+                    worker.healthy = True
+                    worker.backoff = 0.0
+                except (OSError, EOFError, TimeoutError, WorkerPoolError):
+                    worker.healthy = False
+            # Check often until every worker has come up
+            interval = self.health_interval if all(worker.healthy for worker in self._workers) else 0.1
+            self._stopped.wait(interval)
+
+    def _request(self, worker, request, timeout):
+        with self._lock:
+            conn = worker.idle.pop() if worker.idle else None
+            process = worker.process
+        if conn is None:
+            conn = Client(worker.address, "AF_UNIX", authkey=self._authkey)
+        try:
+            conn.send(request)
+            if not conn.poll(timeout):
+                raise TimeoutError(f"Worker {worker.index} did not answer within {timeout}s")
+            status, payload = conn.recv()
+        except BaseException:
+            # The reply may still arrive later, so this connection cannot be reused
+            conn.close()
+            raise
+        with self._lock:
+            # A worker respawned while the request ran gets no connection to its old process back
+            if worker.process is process:
+                worker.idle.append(conn)
+                conn = None
+        if conn is not None:
+            conn.close()
+        if status != "ok":
+            raise WorkerPoolError(payload)
+        return payload
+
+    def predict(self, family, rows):
+        """Score rows on a worker, returning (model version, SoilPredictor.predict() result)"""
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            self.rejected += 1
+            raise WorkerPoolError("All inference workers are busy")
+        try:
+            with self._lock:
+                candidates = [worker for worker in self._workers if worker.healthy]
+                if not candidates:
+                    raise WorkerPoolError("No healthy inference workers")
+                worker = min(candidates, key=lambda candidate: candidate.inflight)
+                worker.inflight += 1
+            try:
+                version, result = self._request(worker, ("predict", family, rows), self.timeout)
+            except TimeoutError:
+                self.timeouts += 1
+                worker.failures += 1
+                raise
+            except (OSError, EOFError) as e:
+                worker.failures += 1
+                worker.healthy = False
+                raise WorkerPoolError(f"Worker {worker.index} failed: {e}") from e
+            finally:
+                with self._lock:
+                    worker.inflight -= 1
+            worker.served += len(rows)
+            return version, result
+        finally:
+            self._slots.release()
+
+    def predict_one(self, family, features, version=None):
+        """Return the (soil quality, industrial use) labels for one sample.
+
+        With version, raise WorkerPoolError unless the worker scored with that
+        model version; workers poll for retrained models on their own schedule.
+        """
+        scored_version, result = self.predict(family, [list(features)])
+        if version is not None and scored_version != version:
+            raise WorkerPoolError(f"Worker scored {family} with version {scored_version}, not {version}")
+        return result["soil_quality"][0], result["industrial_use"][0]
+
+    def stats(self):
+        return {
+            "workers": [
+                {"pid": worker.process.pid if worker.process is not None else None, "healthy": worker.healthy,
+                 "inflight": worker.inflight, "served": worker.served, "failures": worker.failures,
+                 "restarts": worker.restarts}
+                for worker in self._workers
+            ],
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+        }
+
+
+def benchmark(model_dir=".", worker_counts=(1, 2, 4), clients=8, seconds=5.0, family="RandomForest"):
+    """Single-row predictions per second from concurrent client threads, in-process and per pool size"""
+    import numpy as np
+    from registry import ModelRegistry
+
+    row = [1.0, 20.0, 2.5, 7.0, 1.0]
+    release = ModelRegistry(model_dir).get(family)
+    if release is None:
+        raise ValueError(f"Model not loaded for {family}")
+
+    def run(predict_one):
+        counts = [0] * clients
+        deadline = time.perf_counter() + seconds
+
+        def client(i):
+            while time.perf_counter() < deadline:
+                predict_one(row)
+                counts[i] += 1
+
+        threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return sum(counts) / seconds
+
+    results = {"in-process": run(lambda features: release.predictor.predict_one(*features))}
+    for count in worker_counts:
+        pool = WorkerPool(count, model_dir, queue_timeout=60.0).start()
+        try:
+            if not pool.wait_ready():
+                raise WorkerPoolError("Workers did not start")
+            results[f"workers={count}"] = run(lambda features: pool.predict_one(family, features))
+        finally:
+            pool.stop()
+    results["cpu_count"] = float(os.cpu_count() or 1)
+    return {name: float(np.round(value, 1)) for name, value in results.items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Out-of-process inference workers")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = subparsers.add_parser("serve", help="Run one worker (started by WorkerPool)")
+    serve_parser.add_argument("address", help="Unix socket path to listen on")
+    serve_parser.add_argument("--model-dir", default=".")
+
+    bench_parser = subparsers.add_parser("bench", help="Compare throughput in-process and across pool sizes")
+    bench_parser.add_argument("--model-dir", default=".")
+    bench_parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    bench_parser.add_argument("--clients", type=int, default=8, help="Concurrent client threads")
+    bench_parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        authkey = os.environ.get(AUTHKEY_ENV)
+        serve(args.address, args.model_dir, bytes.fromhex(authkey) if authkey else None)
+        return 0
+
+    for name, value in benchmark(args.model_dir, args.workers, args.clients, args.seconds).items():
+        print(f"{name:>12}: {value:,.1f}" + ("" if name == "cpu_count" else " predictions/sec"))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())